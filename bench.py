@@ -0,0 +1,299 @@
+import json
+import platform
+import sys
+import time
+from argparse import ArgumentParser
+from random import Random
+from statistics import variance
+from typing import Any, Callable, Optional
+
+from bulk_parse import parse_cards
+from card import Card, CardSet
+from combinations import Combination
+from equty import common_equity, compute_equity
+from outs import _canonical, _class_counts
+from rank_table import get_table
+from sampling import SAMPLERS
+from strength import _board_strength
+
+# Набор замеров горячих путей. Каждый замер готовит данные из генератора с
+# фиксированным зерном и возвращает функцию, выполняющую ops операций; время
+# операции - лучшее из repeat прогонов этой функции.
+
+Run = Callable[[], Any]
+Setup = Callable[[Random, float], tuple[Run, int]]
+
+SEED = 2024
+CORPUS_SIZE = 2000
+
+BENCHMARKS = dict[str, Setup]()
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def corpus(rnd: Random, size: int, n: int) -> list[CardSet]:
+    """Стандартный набор раздач: size наборов по n разных карт"""
+    return [CardSet(map(Card.from_int, rnd.sample(range(52), n))) for _ in range(size)]
+
+
+@benchmark("card.parse")
+def _card_parse(rnd: Random, scale: float) -> tuple[Run, int]:
+    names = [
+        str(Card.from_int(rnd.randrange(52)))
+        for _ in range(int(CORPUS_SIZE * 5 * scale))
+    ]
+    return lambda: list(map(Card.parse, names)), len(names)
+
+
+@benchmark("cardset.parse")
+def _cardset_parse(rnd: Random, scale: float) -> tuple[Run, int]:
+    strs = list(map(str, corpus(rnd, int(CORPUS_SIZE * scale), 7)))
+    return lambda: list(map(CardSet.parse, strs)), len(strs)
+
+
+@benchmark("bulk_parse.7")
+def _bulk_parse(rnd: Random, scale: float) -> tuple[Run, int]:
+    sets = corpus(rnd, int(CORPUS_SIZE * 10 * scale), 7)
+    text = "\n".join(map(str, sets))
+    return lambda: parse_cards(text), len(sets)
+
+
+def _find_highest(n: int) -> Setup:
+    def setup(rnd: Random, scale: float) -> tuple[Run, int]:
+        sets = corpus(rnd, int(CORPUS_SIZE * scale), n)
+        return lambda: list(map(Combination.find_highest, sets)), len(sets)
+
+    return setup
+
+
+benchmark("find_highest.5")(_find_highest(5))
+benchmark("find_highest.7")(_find_highest(7))
+
+
+@benchmark("compare.7")
+def _compare(rnd: Random, scale: float) -> tuple[Run, int]:
+    combs = list(
+        map(Combination.find_highest, corpus(rnd, int(CORPUS_SIZE * scale), 7))
+    )
+    pairs = list(zip(combs[::2], combs[1::2]))
+    return lambda: [a.compare(b) for a, b in pairs], len(pairs)
+
+
+def _equity(table_size: int, players: int, n: int) -> Setup:
+    def setup(rnd: Random, scale: float) -> tuple[Run, int]:
+        deals = [
+            (s.cards[:2], s.cards[2:])
+            for s in corpus(rnd, max(1, int(5 * scale)), 2 + table_size)
+        ]
+        return (
+            lambda: [
+                compute_equity(hand, table, players, n, seed=SEED, exact=False)
+                for hand, table in deals
+            ],
+            len(deals),
+        )
+
+    return setup
+
+
+for _table_size in (0, 3, 4):
+    for _players in (2, 3, 6):
+        benchmark(f"equity.board{_table_size}.players{_players}")(
+            _equity(_table_size, _players, 5000)
+        )
+
+
+def _board_strength_setup(table_size: int) -> Setup:
+    def setup(rnd: Random, scale: float) -> tuple[Run, int]:
+        boards = [
+            tuple(sorted(map(Card.to_int, s.cards)))
+            for s in corpus(rnd, max(1, int(3 * scale)), table_size)
+        ]
+        # без кэша: каждый стол считается заново
+        return lambda: [_board_strength.__wrapped__(b, 50) for b in boards], len(boards)
+
+    return setup
+
+
+benchmark("board_strength.flop")(_board_strength_setup(3))
+benchmark("board_strength.turn")(_board_strength_setup(4))
+
+
+def _hand_odds_setup(table_size: int) -> Setup:
+    def setup(rnd: Random, scale: float) -> tuple[Run, int]:
+        known = [
+            _canonical(tuple(map(Card.to_int, s.cards)))
+            for s in corpus(rnd, max(1, int(5 * scale)), 2 + table_size)
+        ]
+        return lambda: [_class_counts.__wrapped__(k) for k in known], len(known)
+
+    return setup
+
+
+benchmark("hand_odds.preflop")(_hand_odds_setup(0))
+benchmark("hand_odds.flop")(_hand_odds_setup(3))
+
+
+def run(
+    names: Optional[list[str]] = None, repeat=3, scale=1.0
+) -> dict[str, dict[str, float]]:
+    """Замеры: для каждого - микросекунды на операцию и операции в секунду"""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        fn, ops = setup(Random(SEED), scale)
+        fn()  # прогрев: ленивые таблицы, кэши
+        best = float("inf")
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - begin)
+        results[name] = {"us_per_op": best / ops * 1e6, "ops_per_sec": ops / best}
+    return results
+
+
+# Позиции для сравнения способов выбора раздач: рука, стол, число игроков и
+# вторая рука для сравнения разности эквити
+SAMPLING_SPOTS = {
+    "preflop.players2": ("AH KH", "", 2, "AH KD"),
+    "flop.players2": ("AH KH", "QS JS 2D", 2, "AH KD"),
+    "flop.players6": ("AH KH", "QS JS 2D", 6, "AH KD"),
+    "turn.players2": ("AH KH", "QS JS 2D 5C", 2, "AH KD"),
+}
+
+
+def _spread(estimate: Callable[[int], float], runs: int) -> dict[str, float]:
+    """Дисперсия оценки по runs зернам, процессорное время одной оценки и их
+    произведение - дисперсия оценки, на которую потрачена секунда процессора"""
+    begin = time.process_time()
+    values = [estimate(SEED + run) for run in range(runs)]
+    seconds = (time.process_time() - begin) / runs
+    return {
+        "variance": variance(values),
+        "cpu_seconds": seconds,
+        "variance_x_seconds": variance(values) * seconds,
+    }
+
+
+def sampler_efficiency(
+    spots: Optional[list[str]] = None, runs=20, trials=2000
+) -> dict[str, dict[str, float]]:
+    """Сравнение способов выбора раздач (sampling.SAMPLERS) на позициях
+    SAMPLING_SPOTS: для каждого способа - разброс оценки эквити из trials испытаний,
+    для пары рук - разброс разности их эквити при независимых раздачах и при общих
+    (common_equity). gain - во сколько раз дисперсия на секунду процессора меньше,
+    чем у "random" (для разности - чем у независимых раздач)."""
+    results = {}
+    for spot, (handstr, tablestr, players, otherstr) in SAMPLING_SPOTS.items():
+        if spots and spot not in spots:
+            continue
+        hand, other = CardSet.parse(handstr).cards, CardSet.parse(otherstr).cards
+        table = CardSet.parse(tablestr).cards if tablestr else ()
+
+        def equity(cards: tuple, seed: int, sampler="random") -> float:
+            return compute_equity(
+                cards, table, players, trials, seed=seed, exact=False, sampler=sampler
+            )
+
+        for sampler in SAMPLERS:
+            results[f"{sampler}.{spot}"] = _spread(
+                lambda seed: equity(hand, seed, sampler), runs
+            )
+        results[f"difference.independent.{spot}"] = _spread(
+            lambda seed: equity(hand, seed) - equity(other, seed + runs), runs
+        )
+        results[f"difference.common.{spot}"] = _spread(
+            lambda seed: common_equity(
+                (hand, other), table, players, trials, seed=seed
+            ).difference(0, 1)[0],
+            runs,
+        )
+
+        baselines = {sampler: f"random.{spot}" for sampler in SAMPLERS} | {
+            "difference": f"difference.independent.{spot}"
+        }
+        for name, result in results.items():
+            if name.endswith(f".{spot}"):
+                base = results[baselines[name.split(".")[0]]]["variance_x_seconds"]
+                result["gain"] = base / result["variance_x_seconds"]
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold=0.1,
+) -> dict[str, float]:
+    """Регрессии: замеры, ставшие медленнее baseline более чем на threshold,
+    и во сколько раз выросло время операции"""
+    return {
+        name: result["us_per_op"] / baseline[name]["us_per_op"]
+        for name, result in results.items()
+        if name in baseline
+        and result["us_per_op"] > baseline[name]["us_per_op"] * (1 + threshold)
+    }
+
+
+__all__ = [
+    "BENCHMARKS",
+    "SAMPLING_SPOTS",
+    "benchmark",
+    "compare",
+    "corpus",
+    "run",
+    "sampler_efficiency",
+]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the hot paths")
+    parser.add_argument("names", nargs="*", help="benchmark name prefixes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="corpus size factor")
+    parser.add_argument("--output", metavar="FILE", help="write JSON results to FILE")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="flag regressions against a saved baseline"
+    )
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument(
+        "--samplers",
+        action="store_true",
+        help="also measure variance per CPU second of the equity samplers",
+    )
+    parser.add_argument("--runs", type=int, default=20, help="estimates per sampler")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": SEED,
+            "repeat": args.repeat,
+            "scale": args.scale,
+            # замеры board_strength и equity заметно быстрее с таблицей рангов
+            "rank_tables": [k for k in (5, 6, 7) if get_table(k) is not None],
+        },
+        "results": run(args.names, args.repeat, args.scale),
+    }
+    if args.samplers:
+        report["samplers"] = sampler_efficiency(runs=args.runs)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(report["results"], baseline, args.threshold)
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio:.2f}x slower", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
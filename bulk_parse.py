@@ -0,0 +1,152 @@
+import mmap
+import os
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+import numpy as np
+
+from card import Card
+
+# Разбор больших текстов с наборами карт (по набору в строке, карты через пробел)
+# в массив номеров карт (Card.to_int) за один векторный проход по кодам символов.
+
+Buffer = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+
+# коды символов обозначений карт (латиница и кириллица) меньше этого числа
+_TABLE_SIZE = 0x500
+_SEPARATORS = np.array([ord(c) for c in " \t\r\n"])
+# сколько ошибок перечислять в сообщении исключения
+_MAX_REPORTED = 10
+
+
+def _tables(names: dict[str, Card]) -> tuple[np.ndarray, np.ndarray]:
+    """Таблицы код символа -> достоинство (0..12) и код символа -> масть (-1 - нет)"""
+    values = np.full(_TABLE_SIZE, -1, dtype=np.int16)
+    suits = np.full(_TABLE_SIZE, -1, dtype=np.int16)
+    for name, card in names.items():
+        values[ord(name[0])] = card.value - 2
+        suits[ord(name[1])] = card.suit.value
+    return values, suits
+
+
+_ENGLISH = _tables(Card._names)
+_RUSSIAN = _tables(Card._names_rus)
+
+
+@dataclass
+class ParseResult:
+    """Разобранные наборы: cards - (N, k) номера карт, lines - номер строки
+    (с единицы) каждого набора, errors - отброшенные строки с причинами"""
+
+    cards: np.ndarray
+    lines: np.ndarray
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+
+def _codes(data: Buffer) -> np.ndarray:
+    """Коды символов текста; ASCII-текст не копируется"""
+    if isinstance(data, str):
+        try:
+            return np.frombuffer(data.encode("ascii"), dtype=np.uint8)
+        except UnicodeEncodeError:
+            return np.frombuffer(data.encode("utf-32-le"), dtype=np.uint32)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw) or raw.max() < 0x80:
+        return raw
+    return np.frombuffer(bytes(raw).decode().encode("utf-32-le"), dtype=np.uint32)
+
+
+def _token(codes: np.ndarray, start: int, end: int) -> str:
+    return "".join(map(chr, codes[start:end].tolist()))
+
+
+def parse_cards(
+    data: Buffer, k: Optional[int] = None, rus=False, strict=True
+) -> ParseResult:
+    """Разбирает текст: каждая непустая строка - набор из k карт (по умолчанию k -
+    самое частое число карт в строке) в английской или, при rus, русской записи.
+    Строки с неверными картами, другим числом карт или повторяющимися картами
+    отбрасываются; при strict вместо этого выбрасывается ValueError со списком
+    номеров строк."""
+    valueTable, suitTable = _RUSSIAN if rus else _ENGLISH
+    codes = _codes(data)
+
+    separator = np.isin(codes, _SEPARATORS)
+    lineOf = np.cumsum(codes == ord("\n"))
+    n_lines = int(lineOf[-1]) + 1 if len(codes) else 0
+
+    # токены - непрерывные отрезки символов между разделителями
+    prevSeparator = np.concatenate(([True], separator[:-1]))
+    nextSeparator = np.concatenate((separator[1:], [True]))
+    starts = np.flatnonzero(~separator & prevSeparator)
+    ends = np.flatnonzero(~separator & nextSeparator) + 1
+    tokenLine = lineOf[starts]
+
+    first = codes[starts].astype(np.int64)
+    second = codes[np.minimum(starts + 1, max(len(codes) - 1, 0))].astype(np.int64)
+    known = (first < _TABLE_SIZE) & (second < _TABLE_SIZE)
+    values = np.where(known, valueTable[np.where(known, first, 0)], -1)
+    suits = np.where(known, suitTable[np.where(known, second, 0)], -1)
+    good = (ends - starts == 2) & (values >= 0) & (suits >= 0)
+    ids = values * 4 + suits
+
+    counts = np.bincount(tokenLine, minlength=n_lines)
+    if k is None:
+        k = int(np.bincount(counts[counts > 0]).argmax()) if counts.any() else 0
+
+    errors = dict[int, str]()
+    for i in np.flatnonzero(~good)[::-1].tolist():
+        # с конца, чтобы для строки осталась первая неверная карта
+        errors[int(tokenLine[i])] = f"bad card {_token(codes, starts[i], ends[i])!r}"
+    for line in np.flatnonzero((counts > 0) & (counts != k)).tolist():
+        errors.setdefault(line, f"expected {k} cards, got {counts[line]}")
+
+    goodLine = (counts == k) & (counts > 0)
+    goodLine[list(errors)] = False
+    rows = ids[goodLine[tokenLine]].reshape(-1, k) if k else ids.reshape(0, 0)
+    rowLines = np.flatnonzero(goodLine)
+
+    ordered = np.sort(rows, axis=1)
+    duplicate = (np.diff(ordered, axis=1) == 0).any(axis=1)
+    for row in np.flatnonzero(duplicate).tolist():
+        sortedRow = ordered[row]
+        card = sortedRow[1:][np.diff(sortedRow) == 0][0]
+        errors[int(rowLines[row])] = f"duplicate card {Card.from_int(int(card))}"
+
+    result = ParseResult(
+        rows[~duplicate].astype(np.uint8),
+        rowLines[~duplicate] + 1,
+        sorted((line + 1, message) for line, message in errors.items()),
+    )
+    if strict:
+        _raise_errors(result)
+    return result
+
+
+def _raise_errors(result: ParseResult) -> None:
+    if not result.errors:
+        return
+    details = "; ".join(f"line {n}: {m}" for n, m in result.errors[:_MAX_REPORTED])
+    more = len(result.errors) - _MAX_REPORTED
+    raise ValueError(
+        f"{len(result.errors)} bad lines: {details}"
+        + (f"; and {more} more" if more > 0 else "")
+    )
+
+
+def parse_file(
+    path: Union[str, os.PathLike], k: Optional[int] = None, rus=False, strict=True
+) -> ParseResult:
+    """parse_cards для файла; файл отображается в память, а не читается целиком"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse_cards(b"", k, rus, strict)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            # исключение держало бы ссылку на буфер и не дало бы закрыть отображение
+            result = parse_cards(m, k, rus, strict=False)
+    if strict:
+        _raise_errors(result)
+    return result
+
+
+__all__ = ["ParseResult", "parse_cards", "parse_file"]
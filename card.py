@@ -1,11 +1,9 @@
-from functools import total_ordering
 from typing import *
-from dataclasses import dataclass, replace
 from enum import Enum
 from random import randint, sample
+from itertools import permutations
 from collections.abc import Container
 import numpy as np
-from numpy import ravel_multi_index, unravel_index
 
 
 class Suit(Enum):
@@ -15,60 +13,104 @@ class Suit(Enum):
     H = 3
 
 
-@total_ordering
-@dataclass
 class Card:
+    """Карта. Все 52 карты существуют в единственном экземпляре (Card(...) возвращает
+    уже созданный объект), поэтому они неизменяемы, а сравнение и хэширование
+    сводятся к сравнению номера карты id (см. to_int)."""
+
+    __slots__ = ("id", "suit", "value")
+
+    id: int
     suit: Suit
     value: int
 
-    _val_to_hex: ClassVar[dict[int, Optional[int]]] = str.maketrans("TJQKA", "ABCDE")
+    _cards: ClassVar[tuple["Card", ...]]
+    _names: ClassVar[dict[str, "Card"]]
+    _names_rus: ClassVar[dict[str, "Card"]]
+
+    def __new__(cls, suit: Suit, value: int) -> "Card":
+        if not 2 <= value <= 14:
+            raise ValueError(f"Bad card value: {value}")
+        return cls._cards[(value - 2) * 4 + suit.value]
+
+    @classmethod
+    def _intern(cls, id: int) -> "Card":
+        card = object.__new__(cls)
+        object.__setattr__(card, "id", id)
+        object.__setattr__(card, "suit", Suit(id & 3))
+        object.__setattr__(card, "value", (id >> 2) + 2)
+        return card
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Card is immutable")
+
+    def __reduce__(self):
+        return Card.from_int, (self.id,)
 
     @staticmethod
-    def parse(cardstr: str):
-        return Card(
-            suit=Suit[cardstr[1]],
-            value=int(cardstr[0].translate(Card._val_to_hex), base=16),
-        )
+    def parse(cardstr: str) -> "Card":
+        try:
+            return Card._names[cardstr]
+        except KeyError:
+            raise ValueError(f"Bad card: {cardstr}") from None
 
     @staticmethod
     def parse_rus(cardstr: str) -> "Card":
-        suits = {"П": "S", "Т": "C", "Б": "D", "Ч": "H"}
-        vals = str.maketrans("ЕВДКТ", "ABCDE")
-        return Card(
-            suit=Suit[suits[cardstr[1]]], value=int(cardstr[0].translate(vals), base=16)
-        )
+        try:
+            return Card._names_rus[cardstr]
+        except KeyError:
+            raise ValueError(f"Bad card: {cardstr}") from None
 
     @staticmethod
     def random(excluding: Container["Card"] = ()) -> "Card":
         while True:
-            card = Card(Suit(randint(0, 3)), randint(2, 14))
+            card = Card._cards[randint(0, 51)]
             if card not in excluding:
                 return card
 
     @staticmethod
-    def from_int(raveled: int):
-        t = cast(tuple[int, int], unravel_index(raveled, (13, 4)))
-        return Card(Suit(t[1]), t[0] + 2)
+    def from_int(raveled: int) -> "Card":
+        return Card._cards[raveled]
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.id == other.id
 
-    def __lt__(self, other: Any) -> bool:
-        return (self.value < other.value) or (
-            (self.value == other.value) and (self.suit.value < other.suit.value)
-        )
+    def __hash__(self) -> int:
+        return self.id
+
+    def __lt__(self, other: "Card") -> bool:
+        return self.id < other.id
+
+    def __le__(self, other: "Card") -> bool:
+        return self.id <= other.id
+
+    def __gt__(self, other: "Card") -> bool:
+        return self.id > other.id
+
+    def __ge__(self, other: "Card") -> bool:
+        return self.id >= other.id
 
     def __str__(self) -> str:
-        val = next(
-            (
-                k
-                for k, v in {"T": 10, "J": 11, "Q": 12, "K": 13, "A": 14}.items()
-                if v == self.value
-            ),
-            None,
-        ) or str(self.value)
+        return _CARD_NAMES[self.id]
 
-        return f"{val}{self.suit.name}"
+    def __repr__(self) -> str:
+        return f"Card(suit={self.suit!r}, value={self.value})"
 
     def to_int(self) -> int:
-        return int(ravel_multi_index((self.value - 2, self.suit.value), (13, 4)))
+        """Номер карты 0..51: (value - 2) * 4 + suit.value"""
+        return self.id
+
+
+# Таблицы для разбора и вывода карт: номер карты -> название и обратно
+_CARD_NAMES = tuple(f"{'23456789TJQKA'[i >> 2]}{Suit(i & 3).name}" for i in range(52))
+Card._cards = tuple(map(Card._intern, range(52)))
+Card._names = {name: card for name, card in zip(_CARD_NAMES, Card._cards)}
+Card._names_rus = {
+    "23456789ЕВДКТ"[card.value - 2] + "ПТБЧ"[card.suit.value]: card
+    for card in Card._cards
+}
 
 
 class CardSet(Iterable[Card]):
@@ -78,7 +120,8 @@ class CardSet(Iterable[Card]):
         self.cards = tuple[Card, ...](sorted(cards, reverse=True))
 
     def clone(self) -> "CardSet":
-        return CardSet(map(lambda card: replace(card), self.cards))
+        # карты неизменяемы, копировать их не нужно
+        return CardSet(self.cards)
 
     @property
     def suits(self):
@@ -94,17 +137,12 @@ class CardSet(Iterable[Card]):
 
     @staticmethod
     def random(n: int = 5, excluding: Iterable[Card] = ()) -> "CardSet":
-        return CardSet(
-            map(
-                Card.from_int,
-                np.random.choice(
-                    np.delete(
-                        np.arange(52), tuple(map(Card.to_int, excluding))
-                    ),
-                    n,
-                ),
-            )
-        )
+        """Случайный набор из n разных карт, не входящих в excluding"""
+        return CardSet((CardMask.deck() - CardMask(excluding)).deal(n))
+
+    @property
+    def mask(self) -> "CardMask":
+        return CardMask(self.cards)
 
     def __iter__(self):
         return self.cards.__iter__()
@@ -119,4 +157,128 @@ class CardSet(Iterable[Card]):
         return self.cards.__contains__(__x)
 
 
-__all__ = ["Card", "Suit", "CardSet"]
+# Бит карты в маске: 13 бит на каждую масть, внутри масти - по достоинству
+_CARD_BITS = tuple(1 << ((i & 3) * 13 + (i >> 2)) for i in range(52))
+_BIT_CARDS = tuple(Card.from_int((b % 13) * 4 + b // 13) for b in range(52))
+
+
+class CardMask:
+    """Набор карт в виде 52-битной маски: объединение, пересечение, проверка
+    принадлежности и размер - O(1), маски достоинств по мастям - сдвигом."""
+
+    __slots__ = ("bits",)
+
+    bits: int
+
+    def __init__(self, cards: Iterable[Card] = ()) -> None:
+        bits = 0
+        for card in cards:
+            bits |= _CARD_BITS[card.id]
+        self.bits = bits
+
+    @staticmethod
+    def from_bits(bits: int) -> "CardMask":
+        mask = CardMask()
+        mask.bits = bits
+        return mask
+
+    @staticmethod
+    def from_ints(ids: Iterable[int]) -> "CardMask":
+        bits = 0
+        for i in ids:
+            bits |= _CARD_BITS[i]
+        return CardMask.from_bits(bits)
+
+    @staticmethod
+    def deck() -> "CardMask":
+        return CardMask.from_bits((1 << 52) - 1)
+
+    def suit_mask(self, suit: Suit) -> int:
+        """13-битная маска достоинств карт масти suit (бит 0 - двойка)"""
+        return self.bits >> (13 * suit.value) & 0x1FFF
+
+    @property
+    def rank_mask(self) -> int:
+        """13-битная маска достоинств, встречающихся в наборе"""
+        b = self.bits
+        return (b | b >> 13 | b >> 26 | b >> 39) & 0x1FFF
+
+    def ids(self) -> list[int]:
+        """Номера карт (Card.to_int) по возрастанию"""
+        return sorted(card.id for card in self)
+
+    def deal(self, n: int, rng: Optional[np.random.Generator] = None) -> list[Card]:
+        """n разных случайных карт из набора (без возвращения)"""
+        cards = list(self)
+        if rng is None:
+            return sample(cards, n)
+        return [cards[i] for i in rng.choice(len(cards), n, replace=False)]
+
+    def __or__(self, other: "CardMask") -> "CardMask":
+        return CardMask.from_bits(self.bits | other.bits)
+
+    def __and__(self, other: "CardMask") -> "CardMask":
+        return CardMask.from_bits(self.bits & other.bits)
+
+    def __sub__(self, other: "CardMask") -> "CardMask":
+        return CardMask.from_bits(self.bits & ~other.bits)
+
+    def __contains__(self, card: Card) -> bool:
+        return bool(self.bits & _CARD_BITS[card.id])
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.bits != 0
+
+    def __iter__(self) -> Iterator[Card]:
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield _BIT_CARDS[low.bit_length() - 1]
+            bits ^= low
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CardMask):
+            return NotImplemented
+        return self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __str__(self) -> str:
+        return str(CardSet(self))
+
+
+_SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+
+
+def canonicalize_ints(*groups: Iterable[int]) -> tuple[tuple[int, ...], ...]:
+    """Приводит группы карт в кодировке Card.to_int (например, руку и стол)
+    к каноническому виду с точностью до переименования мастей: из всех 24
+    перестановок мастей выбирается та, что дает лексикографически наименьший
+    набор. Порядок карт внутри группы не важен."""
+    ids = tuple(map(tuple, groups))
+    return min(
+        tuple(tuple(sorted(i & ~3 | perm[i & 3] for i in group)) for group in ids)
+        for perm in _SUIT_PERMUTATIONS
+    )
+
+
+def canonicalize(*groups: Iterable[Card]) -> tuple[tuple[Card, ...], ...]:
+    """То же, что canonicalize_ints, для карт"""
+    return tuple(
+        tuple(map(Card.from_int, group))
+        for group in canonicalize_ints(*(map(Card.to_int, g) for g in groups))
+    )
+
+
+__all__ = [
+    "Card",
+    "Suit",
+    "CardSet",
+    "CardMask",
+    "canonicalize",
+    "canonicalize_ints",
+]
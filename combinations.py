@@ -2,22 +2,19 @@ from abc import abstractmethod
 from enum import Enum
 from typing import (
     Any,
-    Callable,
     ClassVar,
     Iterable,
-    Literal,
     Optional,
     Type,
-    TypeAlias,
     cast,
 )
 from collections import OrderedDict, Counter
 from itertools import islice
-from functools import partial
 
 from utils.assert_utils import assert_expr
 from utils.math import sgn
 from card import Card, CardSet, Suit
+from evaluator import _STRAIGHT_HIGH, _pack
 
 
 # Перечисление, содержащее результат сравнения - удобно в использовании,
@@ -53,60 +50,80 @@ class CombinationMetaclass(type):
             _combinations[attrs["name"]] = newType  # type: ignore
         return newType
 
+    def __call__(cls, *args: Any, **kwargs: Any):
+        # ключ сравнения вычисляется один раз, когда поля комбинации уже заполнены
+        comb = super().__call__(*args, **kwargs)
+        comb.key = _pack(comb.value, comb._key_values())
+        return comb
 
-class Combination(metaclass=CombinationMetaclass):
-    """Базовый абстрактный класс для всех комбинаций."""
 
-    Comparator: TypeAlias = Callable[[CardSet, CardSet], CompareResult]
-    """Тип функции, сравнивающей два набора карт"""
+class Combination(metaclass=CombinationMetaclass):
+    """Базовый абстрактный класс для всех комбинаций. Комбинации сравниваются по
+    ключу key, вычисляемому при создании: стоимость комбинации (value) и значения,
+    по которым сравниваются комбинации одного типа, упакованные в одно число так же,
+    как ранги в evaluator. Поэтому sorted(), max() и heapq работают с комбинациями
+    напрямую, а для комбинации из find_highest key совпадает с evaluate(set)."""
 
     list: ClassVar = _combinations
 
     value: ClassVar[int]
     name: ClassVar[str]
 
+    key: int
     _set: CardSet
 
     @abstractmethod
-    def compare(self, other: "Combination") -> CompareResult:
-        """Абстрактный метод для реализации потомками"""
+    def _key_values(self) -> tuple[int, ...]:
+        """Значения (не более пяти), по которым сравниваются комбинации одного типа,
+        в порядке убывания важности. Реализуется потомками."""
         ...
 
     def __init__(self, set: CardSet):
         self._set = set
 
-    def _compare_pipeline(
-        self, other: "Combination", *comparators: Comparator
-    ) -> CompareResult:
-        """'Конвеер' для сравнения комбинаций - сначала идет сравнение
-        по стоимости самой комбинации (value), затем - по правилам, специфичной
-        для каждой комбинации и указанным в ее реализации."""
-
-        # Клонируем наборы карт для безопасного изменения в дальнейшем
-        firstSet, secondSet = self._set.clone(), other._set.clone()
-
-        # перебираем компараторы
-        for comparator in (
-            cast(
-                Combination.Comparator,
-                lambda _1, _2: compare_ints(self.value, other.value),
-            ),
-            *comparators,
-        ):
-            result = comparator(firstSet, secondSet)
-
-            # если компаратор решает, что комбинации не равны, то вовращаем результат;
-            # иначе - переходим к следующему
-            if result != CompareResult.EQUAL:
-                return result
-
-        # если все компараторы отработали и вернули, что комбинации равны, то они
-        # действительно равны
-        return CompareResult.EQUAL
+    def compare(self, other: "Combination") -> CompareResult:
+        return compare_ints(self.key, other.key)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Combination):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self) -> int:
+        return self.key
+
+    def __lt__(self, other: "Combination") -> bool:
+        return self.key < other.key
+
+    def __le__(self, other: "Combination") -> bool:
+        return self.key <= other.key
+
+    def __gt__(self, other: "Combination") -> bool:
+        return self.key > other.key
+
+    def __ge__(self, other: "Combination") -> bool:
+        return self.key >= other.key
+
+    def _kickers(self, n: int, *excluded: int) -> tuple[int, ...]:
+        """Достоинства n старших карт набора, кроме карт достоинств excluded"""
+        return tuple(
+            islice((c.value for c in self._set.cards if c.value not in excluded), n)
+        )
+
+    @staticmethod
+    def by_value(value: int) -> Type["Combination"]:
+        """Класс комбинации по ее стоимости (value)"""
+        return next(Comb for Comb in Combination.list.values() if Comb.value == value)
 
     @staticmethod
     def find_highest(set: CardSet) -> "Combination":
-        """Метод для нахождения лучшей комбинации для данного набора карт"""
+        """Метод для нахождения лучшей комбинации для данного набора карт.
+        Набор разбирается один раз (см. classify), и создается только один объект."""
+        return classify(set)
+
+    @staticmethod
+    def find_highest_by_trial(set: CardSet) -> "Combination":
+        """Эталонный поиск лучшей комбинации перебором всех классов от старшего к младшему"""
         return next(
             filter(
                 lambda c: c != None,
@@ -116,6 +133,16 @@ class Combination(metaclass=CombinationMetaclass):
             )
         )
 
+    @classmethod
+    def _make(Class, set: CardSet, **fields: Any) -> "Combination":
+        """Создание комбинации с уже известными полями, без проверок в __init__"""
+        comb = Class.__new__(Class)
+        Combination.__init__(comb, set)
+        for name, value in fields.items():
+            setattr(comb, name, value)
+        comb.key = _pack(comb.value, comb._key_values())
+        return comb
+
     @classmethod
     def try_make(Class, set: CardSet):
         try:
@@ -126,18 +153,6 @@ class Combination(metaclass=CombinationMetaclass):
             raise e
 
 
-def apply_to_both(mutator: Callable[[CardSet], CompareResult]):
-    """Декоратор для функций-мутаторов (преобразующих набор карт каким-то образом), возвращающий
-    функцию, применяющую данный мутатор к обоим наборам."""
-
-    def new_mutator(set1: CardSet, set2: CardSet):
-        mutator(set1)
-        mutator(set2)
-        return CompareResult.EQUAL
-
-    return new_mutator
-
-
 def compare_ints(int1: int, int2: int) -> CompareResult:
     return CompareResult.from_int(int1 - int2)
 
@@ -158,16 +173,6 @@ def compare_by_value_n(
     return CompareResult.EQUAL
 
 
-def remove_value_from_set(value: int):
-    """Функция, создающая мутатор для удаления карт определенного значения из набора."""
-
-    @apply_to_both
-    def mutator(set: CardSet):
-        set.cards = tuple(filter(lambda c: c.value != value, set.cards))
-
-    return mutator
-
-
 def produce_combination(combinationValue: int, n: int, combinationName: str):
     """Функция, производящая класс комбинации, состоящей из n одинаковых карт (пара, тройка, каре)"""
 
@@ -188,16 +193,8 @@ def produce_combination(combinationValue: int, n: int, combinationName: str):
             except Exception as e:
                 raise e
 
-        def compare(self, other: "Combination"):
-            return self._compare_pipeline(
-                other,
-                lambda _1, _2: compare_ints(
-                    self.combValue,
-                    cast(MatchingValueCombination, other).combValue,
-                ),
-                remove_value_from_set(self.combValue),
-                partial(compare_by_value_n, n=5 - n),
-            )
+        def _key_values(self) -> tuple[int, ...]:
+            return (self.combValue, *self._kickers(5 - n, self.combValue))
 
     MatchingValueCombination.__name__ = combinationName
 
@@ -215,8 +212,8 @@ class HighCard(Combination):
     def __init__(self, set: CardSet):
         super().__init__(set)
 
-    def compare(self, other: Combination):
-        return self._compare_pipeline(other, partial(compare_by_value_n, n=5))
+    def _key_values(self) -> tuple[int, ...]:
+        return self._kickers(5)
 
 
 Pair = produce_combination(combinationValue=2, n=2, combinationName="Pair")
@@ -242,21 +239,8 @@ class TwoPairs(Combination):
         # берем самые старшие пары
         self.pairValues = cast(tuple[int, int], tuple(sorted(vals, reverse=True))[:2])
 
-    def compare(self, other: Combination):
-        def compare_values(n: Literal[0, 1]):
-            return lambda _1, _2: compare_ints(
-                self.pairValues[n],
-                cast(TwoPairs, other).pairValues[n],
-            )
-
-        return self._compare_pipeline(
-            other,
-            compare_values(0),
-            compare_values(1),
-            remove_value_from_set(self.pairValues[0]),
-            remove_value_from_set(self.pairValues[1]),
-            partial(compare_by_value_n, n=1),
-        )
+    def _key_values(self) -> tuple[int, ...]:
+        return (*self.pairValues, *self._kickers(1, *self.pairValues))
 
 
 ThreeOfAKind = produce_combination(
@@ -273,31 +257,25 @@ class Straight(Combination):
 
     def __init__(self, set: CardSet):
         super().__init__(set)
-        for i in range(len(set.cards) - 4):
-            currentValue = set.values[i]
+        # повторяющиеся достоинства (пары внутри стрита) не должны разрывать последовательность
+        values = tuple(dict.fromkeys(set.values))
+        for i in range(len(values) - 4):
+            currentValue = values[i]
 
             # если 5 карт идут подряд (range())
-            if set.values[i : i + 5] == tuple(
-                range(currentValue, currentValue - 5, -1)
-            ):
+            if values[i : i + 5] == tuple(range(currentValue, currentValue - 5, -1)):
                 self.highValue = currentValue
                 return
 
         # Особый случай A2345
-        if all(map(lambda v: v in set.values, (14, 2, 3, 4, 5))):
+        if all(map(lambda v: v in values, (14, 2, 3, 4, 5))):
             self.highValue = 5
             return
 
         raise CombinationException
 
-    def compare(self, other: Combination):
-        return self._compare_pipeline(
-            other,
-            lambda _1, _2: compare_ints(
-                self.highValue,
-                cast(Straight, other).highValue,
-            ),
-        )
+    def _key_values(self) -> tuple[int, ...]:
+        return (self.highValue,)
 
 
 class Flush(Combination):
@@ -311,18 +289,15 @@ class Flush(Combination):
     def __init__(self, set: CardSet):
         super().__init__(set)
 
-        suit = next((k for k, v in Counter(set.suits).items() if v == 5), None)
+        suit = next((k for k, v in Counter(set.suits).items() if v >= 5), None)
         if not suit:
             raise CombinationException
 
         self.suit = suit
         self.highValue = next(filter(lambda c: c.suit == suit, set.cards)).value
 
-    def compare(self, other: Combination):
-        return self._compare_pipeline(
-            other,
-            lambda _1, _2: compare_ints(self.highValue, cast(Flush, other).highValue),
-        )
+    def _key_values(self) -> tuple[int, ...]:
+        return (self.highValue,)
 
 
 class FullHouse(Combination):
@@ -349,16 +324,8 @@ class FullHouse(Combination):
         except Exception as e:
             raise e
 
-    def compare(self, other: "Combination") -> CompareResult:
-        return self._compare_pipeline(
-            other,
-            lambda _1, _2: compare_ints(
-                self.trioValue, cast(FullHouse, other).trioValue
-            ),
-            lambda _1, _2: compare_ints(
-                self.pairValue, cast(FullHouse, other).pairValue
-            ),
-        )
+    def _key_values(self) -> tuple[int, ...]:
+        return (self.trioValue, self.pairValue)
 
 
 FourOfAKind = produce_combination(
@@ -381,12 +348,62 @@ class StraightFlush(Combination):
         )
         self.highValue = straight.highValue
         if self.highValue == 14:
-            self.name = "Flush Royale" #type: ignore
-
-    def compare(self, other: "Combination") -> CompareResult:
-        return self._compare_pipeline(
-            other,
-            lambda _1, _2: compare_ints(
-                self.highValue, cast(StraightFlush, other).highValue
-            ),
+            self.name = "Flush Royale"  # type: ignore
+
+    def _key_values(self) -> tuple[int, ...]:
+        return (self.highValue,)
+
+
+def _top_value(mask: int) -> int:
+    return mask.bit_length() + 1
+
+
+def classify(set: CardSet) -> Combination:
+    """Однопроходный разбор набора: маски достоинств по мастям берутся из битовой
+    маски набора, из них побитовыми операциями получаются маски достоинств,
+    встречающихся не менее 1..4 раз, и по ним сразу создается старшая комбинация."""
+    mask = set.mask
+    a, b, c, d = (mask.suit_mask(suit) for suit in Suit)
+    m1 = a | b | c | d
+    m2 = a & b | a & c | a & d | b & c | b & d | c & d
+    m3 = a & b & c | a & b & d | a & c & d | b & c & d
+    m4 = a & b & c & d
+
+    flushSuit = next((s for s in Suit if mask.suit_mask(s).bit_count() >= 5), None)
+    if flushSuit is not None:
+        straight = _STRAIGHT_HIGH[mask.suit_mask(flushSuit)]
+        if straight:
+            fields: dict[str, Any] = {"highValue": straight}
+            if straight == 14:
+                fields["name"] = "Flush Royale"
+            return StraightFlush._make(set, **fields)
+
+    if m4:
+        return FourOfAKind._make(set, combValue=_top_value(m4))
+
+    if m3:
+        trio = _top_value(m3)
+        pairs = m2 & ~(1 << (trio - 2))
+        if pairs:
+            return FullHouse._make(set, trioValue=trio, pairValue=_top_value(pairs))
+
+    if flushSuit is not None:
+        return Flush._make(
+            set, suit=flushSuit, highValue=_top_value(mask.suit_mask(flushSuit))
         )
+
+    straight = _STRAIGHT_HIGH[m1]
+    if straight:
+        return Straight._make(set, highValue=straight)
+
+    if m3:
+        return ThreeOfAKind._make(set, combValue=_top_value(m3))
+
+    if m2:
+        high = _top_value(m2)
+        low = m2 & ~(1 << (high - 2))
+        if low:
+            return TwoPairs._make(set, pairValues=(high, _top_value(low)))
+        return Pair._make(set, combValue=high)
+
+    return HighCard._make(set)
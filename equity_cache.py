@@ -0,0 +1,105 @@
+import os
+import pickle
+from collections import OrderedDict
+from typing import Any, Collection, Hashable, Optional
+
+from card import Card, canonicalize_ints
+from equty import compute_equity
+
+
+class EquityCache:
+    """LRU-кэш результатов compute_equity. Ключ - рука и стол в каноническом виде
+    (с точностью до переименования мастей), число игроков, число испытаний и
+    остальные параметры compute_equity, влияющие на результат (все, кроме workers),
+    поэтому AhKh на 2h7c9d и AsKs на 2s7d9c - одна и та же запись."""
+
+    maxsize: int
+    path: Optional[str]
+    hits: int
+    misses: int
+
+    _entries: OrderedDict[Hashable, float]
+
+    def __init__(self, maxsize=100000, path: Optional[str] = None) -> None:
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def key(
+        hand: Collection[Card],
+        table: Collection[Card],
+        num_of_players: int,
+        n: int,
+        **options: Any,
+    ) -> Hashable:
+        return (
+            *canonicalize_ints(map(Card.to_int, hand), map(Card.to_int, table)),
+            num_of_players,
+            n,
+            tuple(sorted((k, v) for k, v in options.items() if k != "workers")),
+        )
+
+    def equity(
+        self,
+        hand: Collection[Card],
+        table: Collection[Card],
+        num_of_players: int,
+        n=5000,
+        **kwargs: Any,
+    ) -> float:
+        """compute_equity с кэшированием; kwargs передаются в compute_equity"""
+        key = self.key(hand, table, num_of_players, n, **kwargs)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        result = compute_equity(hand, table, num_of_players, n, **kwargs)
+        self._entries[key] = result
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Сохраняет записи на диск (в порядке от давно использованных к недавним)"""
+        path = path or self.path
+        assert path, "no path to save the cache to"
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(list(self._entries.items()), f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        assert path, "no path to load the cache from"
+        with open(path, "rb") as f:
+            for key, value in pickle.load(f):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return self._entries.__len__()
+
+
+__all__ = ["EquityCache"]
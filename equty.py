@@ -1,48 +1,474 @@
-from typing import Collection, Iterable
-from card import Card, CardSet
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import combinations, islice
+from math import comb, sqrt
+from statistics import NormalDist
+from typing import Collection, Iterator, Optional, Sequence, Union, cast
+from card import Card, CardMask
 import numpy as np
-from combinations import Combination, CompareResult
+from evaluator import BoardState
+from rank_table import lookup_batch
+from sampling import Dealer, get_sampler
+from showdown import pot_shares, rank_seats
+import preflop
+
+# Число испытаний в одном векторном блоке: ограничивает память под матрицы раздачи.
+# Блок - также единица распределения работы между процессами: у каждого блока
+# свой поток случайных чисел, поэтому результат не зависит от числа процессов.
+BATCH_SIZE = 10000
+
+# Если вариантов раздачи не больше этого числа (или не больше запрошенного числа
+# испытаний), compute_equity перебирает их все вместо случайных испытаний
+EXACT_LIMIT = 50000
+
+_pools = dict[int, ProcessPoolExecutor]()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Пул процессов создается один раз на каждое число процессов и переиспользуется"""
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+@dataclass
+class EquityResult:
+    """Доли выигрышей, ничьих (рука делит первое место) и проигрышей руки,
+    и эквити - средняя доля банка: при ничьей с k игроками засчитывается 1/k"""
+
+    win: float
+    tie: float
+    loss: float
+    equity: float
+
+
+@dataclass
+class EquityEstimate:
+    """Оценка эквити (доли банка) с доверительным интервалом [low, high]
+    и числом испытаний, на которых она получена"""
+
+    estimate: float
+    low: float
+    high: float
+    trials: int
+
+
+def _known_cards(
+    hand: Collection[Card], table: Collection[Card]
+) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """Номера карт руки и стола; карты не должны повторяться"""
+    if len(CardMask(hand) | CardMask(table)) != len(hand) + len(table):
+        raise ValueError("Hand and table contain duplicate cards")
+    return tuple(map(Card.to_int, hand)), tuple(map(Card.to_int, table))
+
+
+def _cardpool(*known: tuple[int, ...]) -> np.ndarray:
+    """Оставшаяся колода"""
+    dead = CardMask.from_ints(c for ids in known for c in ids)
+    return np.array((CardMask.deck() - dead).ids())
 
 
 def compute_equity(
-    hand: Collection[Card], table: Collection[Card], num_of_players: int, n=5000
+    hand: Collection[Card],
+    table: Collection[Card],
+    num_of_players: int,
+    n=5000,
+    batched=True,
+    workers: Optional[int] = 1,
+    seed: Optional[int] = None,
+    exact: Optional[bool] = None,
+    sampler="random",
+    use_table: Optional[bool] = None,
 ) -> float:
-    def cards_to_ndarray(cards: Iterable[Card]):
-        return np.fromiter(map(Card.to_int, cards), int)
+    """Эквити (доля банка с учетом дележа при ничьих) руки hand при столе table
+    против num_of_players - 1 случайных рук. Параметры - как у equity_stats."""
+    return equity_stats(
+        hand,
+        table,
+        num_of_players,
+        n,
+        batched,
+        workers,
+        seed,
+        exact,
+        sampler,
+        use_table,
+    ).equity
+
+
+def equity_stats(
+    hand: Collection[Card],
+    table: Collection[Card],
+    num_of_players: int,
+    n=5000,
+    batched=True,
+    workers: Optional[int] = 1,
+    seed: Optional[int] = None,
+    exact: Optional[bool] = None,
+    sampler="random",
+    use_table: Optional[bool] = None,
+) -> EquityResult:
+    """Доли выигрышей, ничьих и проигрышей и эквити руки hand при столе table против
+    num_of_players - 1 случайных рук.
+    workers - число процессов (None - по числу ядер), seed - зерно для воспроизводимости:
+    при одном и том же seed результат одинаков при любом workers.
+    exact - точный перебор всех раздач; по умолчанию выбирается по их количеству.
+    sampler - способ выбора случайных раздач из sampling.SAMPLERS (кроме "random"
+    требует batched).
+    use_table - брать ответ до флопа из построенной таблицы preflop (если она есть
+    и exact не задан; n, seed и sampler при этом не используются). По умолчанию
+    берется только точный ответ один на один, True - и ответы, полученные в таблице
+    по случайным раздачам, False - таблица не используется."""
+    handIds, tableIds = _known_cards(hand, table)
+    if (
+        not table
+        and exact is None
+        and use_table is not False
+        and len(handIds) == 2
+        and 2 <= num_of_players <= preflop.MAX_PLAYERS
+    ):
+        preflopTable = preflop.get_table()
+        if preflopTable is not None and (
+            use_table or preflopTable.exact and num_of_players == 2
+        ):
+            a, b = handIds
+            win, tie, equity = preflopTable.equity(a, b, num_of_players)
+            return EquityResult(win, tie, 1 - win - tie, equity)
 
-    existingCards = np.concatenate(
-        tuple(map(cards_to_ndarray, (hand, table)))
+    if exact is None:
+        exact = count_deals(len(table), num_of_players) <= max(n, EXACT_LIMIT)
+    if exact:
+        return enumerate_equity(hand, table, num_of_players)
+
+    get_sampler(sampler)
+    if sampler != "random" and not batched:
+        raise ValueError(f"sampler {sampler!r} requires batched=True")
+
+    sizes = [min(BATCH_SIZE, n - start) for start in range(0, n, BATCH_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [
+        (handIds, tableIds, num_of_players, size, chunkSeed, batched, sampler)
+        for size, chunkSeed in zip(sizes, seeds)
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(args) > 1:
+        results = list(_get_pool(workers).map(_showdowns_chunk, *zip(*args)))
+    else:
+        results = [_showdowns_chunk(*a) for a in args]
+
+    wins, ties, share = map(sum, zip(*results))
+    return EquityResult(wins / n, ties / n, (n - wins - ties) / n, share / n)
+
+
+Tally = tuple[int, int, float]
+"""Итог серии раздач: число выигрышей, число ничьих и сумма долей банка"""
+
+
+def _showdowns_chunk(
+    handIds: tuple[int, ...],
+    tableIds: tuple[int, ...],
+    num_of_players: int,
+    n: int,
+    seed: np.random.SeedSequence,
+    batched: bool,
+    sampler="random",
+) -> Tally:
+    rng = np.random.default_rng(seed)
+    cardpool = _cardpool(handIds, tableIds)
+    if batched:
+        return _showdowns(handIds, tableIds, cardpool, num_of_players, n, rng, sampler)
+    return _showdowns_loop(handIds, tableIds, cardpool, num_of_players, n, rng)
+
+
+def _showdowns_loop(
+    handIds: tuple[int, ...],
+    tableIds: tuple[int, ...],
+    cardpool: np.ndarray,
+    num_of_players: int,
+    n: int,
+    rng: np.random.Generator,
+) -> Tally:
+    """Разыгрывает n раздач по одной"""
+    wins = ties = 0
+    share = 0.0
+    n_board = 5 - len(tableIds)
+    n_cards = n_board + 2 * (num_of_players - 1)
+    dealer = Dealer(cardpool, rng)
+    # известные карты стола учитываются один раз, а стол каждой раздачи - один раз
+    # для всех мест; карты остаются целыми числами
+    known = BoardState(tableIds)
+    for _ in range(n):
+        deck = dealer.deal(n_cards)
+        board = known.add(*islice(deck, n_board))
+        hero = board.rank(*handIds)
+        others = [board.rank(deck[i], deck[i + 1]) for i in range(n_board, n_cards, 2)]
+        best = max(others, default=0)
+        if hero > best:
+            wins += 1
+            share += 1
+        elif hero == best:
+            ties += 1
+            share += 1 / (1 + others.count(best))
+
+    return wins, ties, share
+
+
+def _tally(ranks: np.ndarray) -> Tally:
+    """Итог раздач по рангам (N, players), где место 0 - рука hero"""
+    best_other = ranks[:, 1:].max(axis=1, initial=0)
+    return (
+        int((ranks[:, 0] > best_other).sum()),
+        int((ranks[:, 0] == best_other).sum()),
+        float(pot_shares(ranks)[:, 0].sum()),
     )
 
-    cardpool = np.delete(np.arange(52), existingCards)
-
-    n_wins = 0
-    for i in range(n):
-        cursor = 0
-        deck = np.random.permutation(cardpool)
-
-        def next_cards(n: int) -> tuple[Card, ...]:
-            nonlocal cursor
-            r = tuple(map(Card.from_int, deck[cursor : cursor + n]))
-            cursor += n
-            return r
-
-        rnd_table = (*table, *next_cards(5 - len(table)))
-        other_hands = tuple(map(lambda _: next_cards(2), range(num_of_players - 1)))
-        my_comb = Combination.find_highest(CardSet((*rnd_table, *hand)))
-        other_combs = map(
-            lambda player_hand: Combination.find_highest(
-                CardSet((*player_hand, *rnd_table))
-            ),
-            other_hands,
+
+def _showdowns(
+    handIds: tuple[int, ...],
+    tableIds: tuple[int, ...],
+    cardpool: np.ndarray,
+    num_of_players: int,
+    n: int,
+    rng: np.random.Generator,
+    sampler="random",
+) -> Tally:
+    """Разыгрывает n раздач одной матрицей"""
+    n_board = 5 - len(tableIds)
+    dealt = _deal(
+        cardpool, n_board, n_board + 2 * (num_of_players - 1), n, rng, sampler
+    )
+    board, holes = _seat_cards(handIds, tableIds, dealt)
+    return _tally(rank_seats(board, holes))
+
+
+def _deal(
+    cardpool: np.ndarray,
+    n_board: int,
+    n_cards: int,
+    n: int,
+    rng: np.random.Generator,
+    sampler="random",
+) -> np.ndarray:
+    """n раздач по n_cards карт оставшейся колоды (сначала n_board недостающих
+    карт стола, затем карты соперников), выбранных способом sampler"""
+    return get_sampler(sampler)(cardpool, n_board, n_cards, n, rng)
+
+
+def _seat_cards(
+    handIds: tuple[int, ...], tableIds: tuple[int, ...], dealt: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Стол (N, 5) и руки мест (N, players, 2) из розданных карт; место 0 - hero"""
+    n = len(dealt)
+    n_board = 5 - len(tableIds)
+    board = np.hstack(
+        (
+            np.broadcast_to(np.array(tableIds, dtype=int), (n, len(tableIds))),
+            dealt[:, :n_board],
         )
+    )
+    holes = np.concatenate(
+        (
+            np.broadcast_to(handIds, (n, 1, 2)),
+            dealt[:, n_board:].reshape(n, -1, 2),
+        ),
+        axis=1,
+    )
+    return board, holes
 
-        if all(
-            map(
-                lambda otherComb: my_comb.compare(otherComb) == CompareResult.GREATER,
-                other_combs,
-            )
-        ):
-            n_wins += 1
 
-    return n_wins / n
+def count_deals(table_size: int, num_of_players: int) -> int:
+    """Число различных раздач оставшихся карт стола и рук соперников"""
+    remaining = 52 - 2 - table_size
+    count = comb(remaining, 5 - table_size)
+    remaining -= 5 - table_size
+    for _ in range(num_of_players - 1):
+        count *= comb(remaining, 2)
+        remaining -= 2
+    return count
+
+
+def _deal_patterns(n_board: int, n_others: int) -> np.ndarray:
+    """Все способы разложить n_board + 2 * n_others выбранных карт на недостающие
+    карты стола и руки соперников (по порядку мест)"""
+
+    def split(positions: tuple[int, ...], sizes: tuple[int, ...]) -> Iterator[tuple]:
+        if not sizes:
+            yield ()
+            return
+        for group in combinations(positions, sizes[0]):
+            rest = tuple(p for p in positions if p not in group)
+            for tail in split(rest, sizes[1:]):
+                yield (*group, *tail)
+
+    return np.array(
+        list(split(tuple(range(n_board + 2 * n_others)), (n_board, *[2] * n_others))),
+        dtype=int,
+    ).reshape(-1, n_board + 2 * n_others)
+
+
+def enumerate_equity(
+    hand: Collection[Card], table: Collection[Card], num_of_players: int
+) -> EquityResult:
+    """Точные доли выигрышей, ничьих и проигрышей и эквити перебором всех раздач"""
+    handIds, tableIds = _known_cards(hand, table)
+    cardpool = _cardpool(handIds, tableIds)
+
+    n_board = 5 - len(tableIds)
+    n_others = num_of_players - 1
+    patterns = _deal_patterns(n_board, n_others)
+
+    wins = ties = total = 0
+    share = 0.0
+    subsets = combinations(cardpool.tolist(), n_board + 2 * n_others)
+    while chunk := list(islice(subsets, max(1, BATCH_SIZE // len(patterns)))):
+        # каждое подмножество карт раскладывается всеми способами
+        dealt = np.array(chunk, dtype=int)[:, patterns].reshape(-1, patterns.shape[1])
+        board, holes = _seat_cards(handIds, tableIds, dealt)
+        chunkWins, chunkTies, chunkShare = _tally(rank_seats(board, holes))
+        wins += chunkWins
+        ties += chunkTies
+        share += chunkShare
+        total += len(dealt)
+
+    return EquityResult(
+        wins / total, ties / total, (total - wins - ties) / total, share / total
+    )
+
+
+def _wilson_interval(wins: float, n: int, z: float) -> tuple[float, float]:
+    """Доверительный интервал Уилсона: в отличие от p ± z*sqrt(p(1-p)/n)
+    не схлопывается в точку при p = 0 или p = 1"""
+    p = wins / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def estimate_equity(
+    hand: Collection[Card],
+    table: Collection[Card],
+    num_of_players: int,
+    stderr: Optional[float] = None,
+    half_width: Optional[float] = None,
+    confidence=0.95,
+    block=500,
+    max_trials=1000000,
+    seed: Optional[int] = None,
+) -> EquityEstimate:
+    """Эквити, вычисляемое блоками по block испытаний до тех пор, пока
+    полуширина доверительного интервала не станет не больше half_width
+    (или стандартная ошибка - не больше stderr), но не более max_trials испытаний.
+    Доли банка лежат в [0, 1], и их дисперсия не больше, чем у доли выигрышей,
+    поэтому интервал Уилсона для них консервативен."""
+    if (stderr is None) == (half_width is None):
+        raise ValueError("exactly one of stderr and half_width must be given")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    if block < 1 or max_trials < 1:
+        raise ValueError("block and max_trials must be at least 1")
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    target = half_width if half_width is not None else z * cast(float, stderr)
+    if not target > 0:
+        raise ValueError("stderr and half_width must be positive")
+
+    handIds, tableIds = _known_cards(hand, table)
+    seeds = np.random.SeedSequence(seed)
+
+    share = 0.0
+    trials = 0
+    while True:
+        size = min(block, max_trials - trials)
+        share += _showdowns_chunk(
+            handIds, tableIds, num_of_players, size, seeds.spawn(1)[0], True
+        )[2]
+        trials += size
+
+        low, high = _wilson_interval(share, trials, z)
+        if (high - low) / 2 <= target or trials >= max_trials:
+            return EquityEstimate(share / trials, low, high, trials)
+
+
+@dataclass
+class CommonEquity:
+    """Эквити нескольких вариантов, оцененные на общих раздачах: equity - оценки,
+    covariance - их ковариационная матрица, trials - число испытаний. Ошибки оценок
+    сильно положительно коррелированы, поэтому разность эквити двух вариантов
+    известна гораздо точнее, чем каждое из них."""
+
+    equity: np.ndarray
+    covariance: np.ndarray
+    trials: int
+
+    def stderr(self) -> np.ndarray:
+        return np.sqrt(np.diag(self.covariance))
+
+    def difference(self, i: int, j: int) -> tuple[float, float]:
+        """Разность эквити вариантов i и j и ее стандартная ошибка"""
+        c = self.covariance
+        return (
+            float(self.equity[i] - self.equity[j]),
+            sqrt(max(0.0, c[i, i] + c[j, j] - 2 * c[i, j])),
+        )
+
+
+def common_equity(
+    hands: Sequence[Collection[Card]],
+    table: Collection[Card],
+    num_of_players: Union[int, Sequence[int]],
+    n=5000,
+    seed: Optional[int] = None,
+    antithetic=False,
+) -> CommonEquity:
+    """Эквити рук hands при столе table на общих случайных числах: в каждом испытании
+    каждая карта колоды получает случайный ключ, и для каждой руки оставшиеся карты
+    раздаются по возрастанию ключей. Раздачи разных рук совпадают везде, где не
+    участвуют карты других рук, а каждая оценка в отдельности распределена так же,
+    как у compute_equity. num_of_players - число игроков, общее или для каждой руки
+    (например, для вариантов ставки с разным числом ответивших).
+    antithetic - испытания парами с ключами u и 1 - u."""
+    if not hands:
+        raise ValueError("at least one hand is required")
+    players = (
+        [num_of_players] * len(hands)
+        if isinstance(num_of_players, int)
+        else list(num_of_players)
+    )
+    if len(players) != len(hands):
+        raise ValueError("num_of_players must be given for every hand")
+    known = [_known_cards(hand, table) for hand in hands]
+    tableIds = known[0][1]
+    pools = [_cardpool(handIds, tableIds) for handIds, _ in known]
+    n_board = 5 - len(tableIds)
+
+    sizes = [min(BATCH_SIZE, n - start) for start in range(0, n, BATCH_SIZE)]
+    total = np.zeros(len(hands))
+    products = np.zeros((len(hands), len(hands)))
+    units = trials = 0
+    for size, chunkSeed in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        rng = np.random.default_rng(chunkSeed)
+        if antithetic:
+            keys = rng.random(((size + 1) // 2, 52))
+            keys = np.vstack((keys, 1 - keys))
+        else:
+            keys = rng.random((size, 52))
+        shares = np.empty((len(hands), len(keys)))
+        for i, ((handIds, _), pool, p) in enumerate(zip(known, pools, players)):
+            n_cards = n_board + 2 * (p - 1)
+            dealt = pool[np.argsort(keys[:, pool], axis=1)[:, :n_cards]]
+            board, holes = _seat_cards(handIds, tableIds, dealt)
+            shares[i] = pot_shares(rank_seats(board, holes))[:, 0]
+        if antithetic:
+            half = len(keys) // 2
+            shares = (shares[:, :half] + shares[:, half:]) / 2
+        total += shares.sum(axis=1)
+        products += shares @ shares.T
+        units += shares.shape[1]
+        trials += len(keys)
+
+    # ковариация средних - выборочная ковариация, деленная на число слагаемых
+    mean = total / units
+    covariance = (products - units * np.outer(mean, mean)) / max(1, units - 1) / units
+    return CommonEquity(mean, covariance, trials)
@@ -0,0 +1,320 @@
+from itertools import combinations_with_replacement
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from card import Card
+
+# Ранг руки кодируется одним целым числом: старшие биты - номер комбинации
+# (совпадает с Combination.value), младшие пять полубайт - значения карт,
+# по которым комбинации одного типа сравниваются в Combination.compare.
+# Чем больше число, тем сильнее рука.
+CATEGORY_SHIFT = 20
+
+# Простые числа для достоинств 2..A (идея Cactus Kev): произведение простых
+# однозначно задает мультимножество достоинств набора, независимо от порядка карт
+_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_CARD_PRIMES = tuple(_PRIMES[i >> 2] for i in range(52))
+
+# Маска A2345 (туз - бит 12)
+_WHEEL = 0b1000000001111
+
+
+def category(rank: int) -> int:
+    """Номер комбинации (Combination.value) по рангу руки"""
+    return rank >> CATEGORY_SHIFT
+
+
+def _pack(category: int, values: Sequence[int]) -> int:
+    rank = category
+    for i in range(5):
+        rank = rank << 4 | (values[i] if i < len(values) else 0)
+    return rank
+
+
+def _top(mask: int, n: int) -> list[int]:
+    """Значения n старших достоинств из битовой маски"""
+    values: list[int] = []
+    while mask and len(values) < n:
+        bit = mask.bit_length() - 1
+        values.append(bit + 2)
+        mask ^= 1 << bit
+    return values
+
+
+def _straight_high(mask: int) -> int:
+    for high in range(12, 3, -1):
+        window = 0b11111 << (high - 4)
+        if mask & window == window:
+            return high + 2
+    return 5 if mask & _WHEEL == _WHEEL else 0
+
+
+def _flush_rank(mask: int) -> int:
+    if mask.bit_count() < 5:
+        return 0
+    straight = _STRAIGHT_HIGH[mask]
+    if straight:
+        return _pack(9, (straight,))
+    # старшинство флеша определяется одной старшей картой (см. Flush)
+    return _pack(6, _top(mask, 1))
+
+
+# Таблицы по 13-битной маске достоинств
+_STRAIGHT_HIGH = tuple(_straight_high(m) for m in range(1 << 13))
+_FLUSH = tuple(_flush_rank(m) for m in range(1 << 13))
+
+
+def _rank_from_masks(m1: int, m2: int, m3: int, m4: int) -> int:
+    """Ранг руки без учета флеша. mN - маска достоинств, встречающихся хотя бы N раз."""
+    if m4:
+        quad = m4.bit_length() - 1
+        return _pack(8, (quad + 2, *_top(m1 & ~(1 << quad), 1)))
+
+    if m3:
+        trio = m3.bit_length() - 1
+        pair = _top(m2 & ~(1 << trio), 1)
+        if pair:
+            return _pack(7, (trio + 2, *pair))
+
+    straight = _STRAIGHT_HIGH[m1]
+    if straight:
+        return _pack(5, (straight,))
+
+    if m3:
+        return _pack(4, (trio + 2, *_top(m1 & ~(1 << trio), 2)))
+
+    if m2:
+        pairs = _top(m2, 2)
+        rest = m1
+        for value in pairs:
+            rest &= ~(1 << (value - 2))
+        if len(pairs) == 2:
+            return _pack(3, (*pairs, *_top(rest, 1)))
+        return _pack(2, (*pairs, *_top(rest, 3)))
+
+    return _pack(1, _top(m1, 5))
+
+
+def _rank_from_counts(counts: Sequence[int]) -> int:
+    masks = [0] * 5
+    for r, count in enumerate(counts):
+        for k in range(1, min(count, 4) + 1):
+            masks[k] |= 1 << r
+    return _rank_from_masks(masks[1], masks[2], masks[3], masks[4])
+
+
+_rank_table: Optional[dict[int, int]] = None
+
+
+def _get_rank_table() -> dict[int, int]:
+    """Таблица 'произведение простых -> ранг без флеша' для всех наборов до 7 карт.
+    Строится один раз при первом обращении."""
+    global _rank_table
+    if _rank_table is None:
+        table = dict[int, int]()
+        for n in range(8):
+            for ranks in combinations_with_replacement(range(13), n):
+                counts = [0] * 13
+                product = 1
+                for r in ranks:
+                    counts[r] += 1
+                    product *= _PRIMES[r]
+                if max(counts, default=0) <= 4:
+                    table[product] = _rank_from_counts(counts)
+        _rank_table = table
+    return _rank_table
+
+
+def evaluate_ints(ids: Iterable[int]) -> int:
+    """Ранг лучшей комбинации для набора карт в кодировке Card.to_int"""
+    product = 1
+    suits = [0, 0, 0, 0]
+    n = 0
+    for i in ids:
+        product *= _CARD_PRIMES[i]
+        suits[i & 3] |= 1 << (i >> 2)
+        n += 1
+
+    if n > 7:
+        # в больших наборах флеш может соседствовать с фулл-хаусом и каре,
+        # поэтому ранг считается напрямую
+        counts = [sum(m >> r & 1 for m in suits) for r in range(13)]
+        return max(_rank_from_counts(counts), *map(_FLUSH.__getitem__, suits))
+
+    # в наборе до 7 карт флеш несовместим с фулл-хаусом и каре
+    # и всегда старше остальных комбинаций
+    flush = _FLUSH[suits[0]] or _FLUSH[suits[1]] or _FLUSH[suits[2]] or _FLUSH[suits[3]]
+    if flush:
+        return flush
+
+    return _get_rank_table()[product]
+
+
+def evaluate(cards: Iterable[Card]) -> int:
+    """Ранг лучшей комбинации для набора карт. Ранги сравниваются как числа
+    в точности так же, как Combination.compare сравнивает комбинации."""
+    return evaluate_ints(map(Card.to_int, cards))
+
+
+class BoardState:
+    """Частично известный набор карт (например, стол), к которому добавляются
+    карты: произведение простых и маски мастей считаются один раз, а добавление
+    карт (add) и ранг набора с еще несколькими картами (rank) - O(1) на карту.
+    Удобно, когда один стол дополняется руками нескольких игроков или
+    открывается по улицам (флоп, терн, ривер)."""
+
+    __slots__ = ("ids", "product", "suits", "flush", "longest")
+
+    ids: tuple[int, ...]
+    product: int
+    suits: tuple[int, ...]
+    flush: int
+    """Ранг флеша (или стрит-флеша) среди карт состояния, 0 - нет флеша"""
+    longest: int
+    """Число карт самой длинной масти"""
+
+    def __init__(self, ids: Iterable[int] = ()) -> None:
+        self.ids = tuple(ids)
+        self._set(self.ids, 1, (0, 0, 0, 0))
+
+    def _set(self, ids: tuple[int, ...], product: int, suits: tuple[int, ...]) -> None:
+        s0, s1, s2, s3 = suits
+        for i in ids:
+            product *= _CARD_PRIMES[i]
+            bit = 1 << (i >> 2)
+            suit = i & 3
+            if suit == 0:
+                s0 |= bit
+            elif suit == 1:
+                s1 |= bit
+            elif suit == 2:
+                s2 |= bit
+            else:
+                s3 |= bit
+        self.product = product
+        self.suits = (s0, s1, s2, s3)
+        self.flush = _FLUSH[s0] or _FLUSH[s1] or _FLUSH[s2] or _FLUSH[s3]
+        self.longest = max(
+            s0.bit_count(), s1.bit_count(), s2.bit_count(), s3.bit_count()
+        )
+
+    def add(self, *ids: int) -> "BoardState":
+        """Новое состояние с еще несколькими картами"""
+        state = object.__new__(BoardState)
+        state.ids = self.ids + ids
+        state._set(ids, self.product, self.suits)
+        return state
+
+    def rank(self, *ids: int) -> int:
+        """Ранг набора из карт состояния и карт ids (как у evaluate_ints)"""
+        if len(self.ids) + len(ids) > 7:
+            return evaluate_ints((*self.ids, *ids))
+        product = self.product
+        for i in ids:
+            product *= _CARD_PRIMES[i]
+
+        # в наборе до 7 карт флеш старше всего, что без него (см. evaluate_ints);
+        # если даже в самой длинной масти не набрать 5 карт, флеш не проверяется
+        if self.longest + len(ids) >= 5:
+            suits = list(self.suits)
+            for i in ids:
+                suits[i & 3] |= 1 << (i >> 2)
+            flush = max(self.flush, *map(_FLUSH.__getitem__, suits))
+            if flush:
+                return flush
+        return (_rank_table or _get_rank_table())[product]
+
+
+# Те же таблицы для векторного вычисления: старшее значение маски (0 для пустой)
+# и маска без старшего бита
+_STRAIGHT_HIGH_ARRAY = np.array(_STRAIGHT_HIGH, dtype=np.int64)
+_FLUSH_ARRAY = np.array(_FLUSH, dtype=np.int64)
+_TOP_VALUE = np.array([m.bit_length() + 1 if m else 0 for m in range(1 << 13)])
+_DROP_TOP = np.array(
+    [m & ~(1 << (m.bit_length() - 1)) if m else 0 for m in range(1 << 13)]
+)
+_POW2 = 1 << np.arange(13)
+
+
+def _top_batch(mask: np.ndarray, n: int) -> list[np.ndarray]:
+    values = []
+    for _ in range(n):
+        values.append(_TOP_VALUE[mask])
+        mask = _DROP_TOP[mask]
+    return values
+
+
+def _without(mask: np.ndarray, value: np.ndarray) -> np.ndarray:
+    """Маска без достоинства value (0 - нет достоинства)"""
+    return mask & ~np.where(value > 0, 1 << np.maximum(value - 2, 0), 0)
+
+
+def _pack_batch(category: int, values: Sequence[np.ndarray]) -> np.ndarray:
+    rank = np.full(len(values[0]), category << CATEGORY_SHIFT, dtype=np.int64)
+    for i, value in enumerate(values):
+        rank = rank | value << (16 - 4 * i)
+    return rank
+
+
+def evaluate_batch(ids: np.ndarray) -> np.ndarray:
+    """Ранги (как у evaluate_ints) для массива наборов формы (N, k) в кодировке
+    Card.to_int. Все вычисления векторные, без цикла по рукам."""
+    ids = np.asarray(ids, dtype=np.int64)
+    ranks, suits = ids >> 2, ids & 3
+    rows = np.arange(len(ids))
+
+    # гистограмма достоинств и маски "достоинство встречается хотя бы n раз"
+    counts = np.zeros((len(ids), 13), dtype=np.int8)
+    for j in range(ids.shape[1]):
+        counts[rows, ranks[:, j]] += 1
+    m1, m2, m3, m4 = ((counts >= n) @ _POW2 for n in range(1, 5))
+
+    # маски достоинств по мастям: флеш и стрит-флеш берутся из таблицы
+    bits = 1 << ranks
+    flush = np.zeros(len(ids), dtype=np.int64)
+    for suit in range(4):
+        mask = np.bitwise_or.reduce(np.where(suits == suit, bits, 0), axis=1)
+        flush = np.maximum(flush, _FLUSH_ARRAY[mask])
+
+    straight = _STRAIGHT_HIGH_ARRAY[m1]
+    quad = _TOP_VALUE[m4]
+    trio = _TOP_VALUE[m3]
+    full_pair = _TOP_VALUE[_without(m2, trio)]
+    pair1, pair2 = _top_batch(m2, 2)
+
+    return np.select(
+        (
+            flush >= 9 << CATEGORY_SHIFT,
+            quad > 0,
+            (trio > 0) & (full_pair > 0),
+            flush > 0,
+            straight > 0,
+            trio > 0,
+            pair2 > 0,
+            pair1 > 0,
+        ),
+        (
+            flush,
+            _pack_batch(8, (quad, *_top_batch(_without(m1, quad), 1))),
+            _pack_batch(7, (trio, full_pair)),
+            flush,
+            _pack_batch(5, (straight,)),
+            _pack_batch(4, (trio, *_top_batch(_without(m1, trio), 2))),
+            _pack_batch(
+                3, (pair1, pair2, *_top_batch(_without(_without(m1, pair1), pair2), 1))
+            ),
+            _pack_batch(2, (pair1, *_top_batch(_without(m1, pair1), 3))),
+        ),
+        _pack_batch(1, _top_batch(m1, 5)),
+    )
+
+
+__all__ = [
+    "BoardState",
+    "CATEGORY_SHIFT",
+    "category",
+    "evaluate",
+    "evaluate_batch",
+    "evaluate_ints",
+]
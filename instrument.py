@@ -0,0 +1,194 @@
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+from typing import Any, Callable, Optional
+
+import equty
+from combinations import Combination
+
+# Необязательные счетчики горячих путей. Пока они не включены, библиотека
+# работает без изменений: enable() подменяет функции обертками, которые считают
+# вызовы и время, disable() возвращает исходные функции. Учитывается только
+# работа в текущем процессе (при compute_equity с workers > 1 блоки, посчитанные
+# в других процессах, в счетчики не попадают).
+#
+# Отдельного конвейера сравнения больше нет: compare - одно сравнение ключей,
+# поэтому его время учитывается целиком, без разбивки по этапам. По той же
+# причине find_highest (classify) не вызывает try_make, и неудачи try_make
+# считаются только у эталонного find_highest_by_trial и прямых вызовов try_make -
+# в обычной работе библиотеки этот счетчик пуст.
+
+_PHASES = {
+    "_deal": "deal",
+    "_seat_cards": "convert",
+    "rank_seats": "evaluate",
+    "_tally": "compare",
+}
+
+_counts = Counter[tuple[str, str]]()
+_seconds = defaultdict[tuple[str, str], float](float)
+_originals: list[tuple[Any, str, Any]] = []
+
+
+def _patch(owner: Any, name: str, make: Callable[[Callable], Callable]) -> None:
+    """Заменяет owner.name оберткой make(функция), запоминая исходный атрибут"""
+    original = vars(owner)[name]
+    _originals.append((owner, name, original))
+    if isinstance(original, staticmethod):
+        setattr(owner, name, staticmethod(make(original.__func__)))
+    elif isinstance(original, classmethod):
+        setattr(owner, name, classmethod(make(original.__func__)))
+    else:
+        setattr(owner, name, make(original))
+
+
+def _timed(metric: str, label: str) -> Callable[[Callable], Callable]:
+    def make(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            begin = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _counts[metric, label] += 1
+                _seconds[metric, label] += time.perf_counter() - begin
+
+        return wrapper
+
+    return make
+
+
+def _count_find_highest(fn: Callable) -> Callable:
+    @wraps(fn)
+    def wrapper(set: Any) -> Combination:
+        comb = fn(set)
+        _counts["find_highest", type(comb).__name__] += 1
+        return comb
+
+    return wrapper
+
+
+def _count_try_make(fn: Callable) -> Callable:
+    @wraps(fn)
+    def wrapper(Class: type, set: Any) -> Optional[Combination]:
+        comb = fn(Class, set)
+        if comb is None:
+            _counts["try_make_failures", Class.__name__] += 1
+        return comb
+
+    return wrapper
+
+
+def _count_trials(fn: Callable) -> Callable:
+    @wraps(fn)
+    def wrapper(*args: Any) -> Any:
+        _counts["equity_trials", ""] += args[3]
+        return fn(*args)
+
+    return wrapper
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def enable() -> None:
+    """Включает счетчики (повторный вызов ничего не делает)"""
+    if enabled():
+        return
+    _patch(Combination, "find_highest", _count_find_highest)
+    _patch(Combination, "try_make", _count_try_make)
+    _patch(Combination, "compare", _timed("compare", ""))
+    _patch(equty, "equity_stats", _timed("equity", ""))
+    _patch(equty, "_showdowns_chunk", _count_trials)
+    for name, phase in _PHASES.items():
+        _patch(equty, name, _timed("equity_phase", phase))
+
+
+def disable() -> None:
+    """Возвращает исходные функции; накопленные значения сохраняются"""
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+
+
+def reset() -> None:
+    _counts.clear()
+    _seconds.clear()
+
+
+def _by_label(values: dict[tuple[str, str], Any], metric: str) -> dict[str, Any]:
+    return {label: v for (m, label), v in sorted(values.items()) if m == metric}
+
+
+def snapshot() -> dict[str, Any]:
+    """Текущие значения счетчиков"""
+    seconds = _seconds["equity", ""]
+    trials = _counts["equity_trials", ""]
+    return {
+        "find_highest": _by_label(_counts, "find_highest"),
+        "try_make_failures": _by_label(_counts, "try_make_failures"),
+        "compare": {
+            "calls": _counts["compare", ""],
+            "seconds": _seconds["compare", ""],
+        },
+        "equity": {
+            "calls": _counts["equity", ""],
+            "seconds": seconds,
+            "trials": trials,
+            "trials_per_second": trials / seconds if seconds else 0.0,
+            "phases": _by_label(_seconds, "equity_phase"),
+        },
+    }
+
+
+def prometheus(prefix="poker") -> str:
+    """Счетчики в текстовом формате Prometheus"""
+    lines = []
+
+    def metric(name: str, help: str, values: dict[str, Any], label="") -> None:
+        lines.append(f"# HELP {prefix}_{name} {help}")
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        for key, value in values.items():
+            labels = f'{{{label}="{key}"}}' if label else ""
+            lines.append(f"{prefix}_{name}{labels} {value}")
+
+    metric(
+        "find_highest_total",
+        "Combinations found, by class",
+        _by_label(_counts, "find_highest"),
+        "combination",
+    )
+    metric(
+        "try_make_failures_total",
+        "Failed try_make attempts, by class (find_highest does not use try_make)",
+        _by_label(_counts, "try_make_failures"),
+        "combination",
+    )
+    metric("compare_total", "Combination comparisons", {"": _counts["compare", ""]})
+    metric(
+        "compare_seconds_total",
+        "Time spent in Combination.compare",
+        {"": _seconds["compare", ""]},
+    )
+    metric("equity_total", "Equity computations", {"": _counts["equity", ""]})
+    metric(
+        "equity_seconds_total",
+        "Time spent computing equity",
+        {"": _seconds["equity", ""]},
+    )
+    metric(
+        "equity_trials_total",
+        "Monte Carlo trials played",
+        {"": _counts["equity_trials", ""]},
+    )
+    metric(
+        "equity_phase_seconds_total",
+        "Time spent in equity phases",
+        _by_label(_seconds, "equity_phase"),
+        "phase",
+    )
+    return "\n".join(lines) + "\n"
+
+
+__all__ = ["disable", "enable", "enabled", "prometheus", "reset", "snapshot"]
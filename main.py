@@ -1,16 +1,133 @@
-from typing import Literal
-from card import CardSet
-from combinations import Combination
+import json
+import sys
+import time
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Iterable, Literal, Optional
+from card import Card, CardMask, CardSet
+from combinations import compare_ints
+from rank_table import lookup
+
+# Число строк, обрабатываемых за одно обращение к процессу пакетного режима
+CHUNK_SIZE = 10000
 
 
 def compare_hands(set1str: str, set2str: str) -> Literal[-1, 0, 1]:
-    def get_combination(setstr: str):
-        return Combination.find_highest(CardSet.parse(setstr))
+    def get_rank(setstr: str):
+        cards = CardSet.parse(setstr).cards
+        if len(CardMask(cards)) != len(cards):
+            raise ValueError(f"Duplicate cards: {setstr}")
+        return lookup(tuple(map(Card.to_int, cards)))
+
+    return compare_ints(get_rank(set1str), get_rank(set2str)).value
+
+
+def _split_pair(line: str) -> tuple[str, str]:
+    """Строка пакетного режима - два набора через табуляцию или '|'"""
+    sep = "\t" if "\t" in line else "|"
+    first, second = line.split(sep)
+    return first.strip(), second.strip()
+
+
+def compare_lines(lines: list[str], start: int, as_json: bool) -> tuple[str, int]:
+    """Сравнивает пары наборов из строк (start - номер первой строки) и возвращает
+    готовый вывод и число ошибок. Строка с ошибкой дает пустую строку вывода
+    (или запись с полем error в JSON), чтобы вывод оставался выровнен по вводу."""
+    out = []
+    errors = 0
+    for lineno, line in enumerate(lines, start):
+        try:
+            result = compare_hands(*_split_pair(line.rstrip("\n")))
+        except ValueError as e:
+            errors += 1
+            out.append(json.dumps({"line": lineno, "error": str(e)}) if as_json else "")
+            continue
+        out.append(
+            json.dumps({"line": lineno, "result": result}) if as_json else str(result)
+        )
+    return "".join(s + "\n" for s in out), errors
+
 
-    return get_combination(set1str).compare(get_combination(set2str)).value
+def run_batch(
+    lines: Iterable[str],
+    out: IO[str],
+    as_json=False,
+    workers=1,
+    chunk_size=CHUNK_SIZE,
+    stats: Optional[IO[str]] = sys.stderr,
+) -> tuple[int, int]:
+    """Пакетный режим: сравнивает пары наборов из lines потоком, блоками по
+    chunk_size строк. При workers > 1 блоки обрабатываются в процессах, в обработке
+    одновременно не более 2 * workers блоков, поэтому память ограничена при любом
+    размере ввода, а порядок вывода совпадает с порядком ввода.
+    Возвращает число строк и число ошибок; статистика скорости пишется в stats."""
+    begin = time.perf_counter()
+    it = iter(lines)
+    total = errors = 0
+
+    def chunks() -> Iterable[tuple[list[str], int]]:
+        start = 1
+        while chunk := list(islice(it, chunk_size)):
+            yield chunk, start
+            start += len(chunk)
+
+    def write(result: tuple[str, int], size: int) -> None:
+        nonlocal total, errors
+        out.write(result[0])
+        total += size
+        errors += result[1]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque[tuple[Future, int]]()
+            for chunk, start in chunks():
+                if len(pending) >= 2 * workers:
+                    future, size = pending.popleft()
+                    write(future.result(), size)
+                pending.append(
+                    (pool.submit(compare_lines, chunk, start, as_json), len(chunk))
+                )
+            while pending:
+                future, size = pending.popleft()
+                write(future.result(), size)
+    else:
+        for chunk, start in chunks():
+            write(compare_lines(chunk, start, as_json), len(chunk))
+    out.flush()
+
+    elapsed = time.perf_counter() - begin
+    if stats is not None:
+        print(
+            f"{total} pairs, {errors} errors in {elapsed:.2f} s "
+            f"({total / elapsed if elapsed else 0:.0f} pairs/s)",
+            file=stats,
+        )
+    return total, errors
 
 
 if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare poker hands")
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="compare hand pairs (tab or '|' separated), one per line, "
+        "from FILE or stdin; print -1/0/1 per line",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.batch is not None:
+        source = sys.stdin if args.batch == "-" else open(args.batch)
+        with source:
+            run_batch(source, sys.stdout, args.json, args.workers, args.chunk_size)
+        sys.exit()
+
     set1 = input("Input first card set:")
     set2 = input("Input second card set:")
 
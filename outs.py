@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import pairwise, permutations, product
+from math import comb, factorial
+from typing import Collection, Iterable, Type
+
+import numpy as np
+
+from card import Card, CardSet
+from combinations import (
+    Combination,
+    Flush,
+    FourOfAKind,
+    FullHouse,
+    HighCard,
+    Pair,
+    Straight,
+    StraightFlush,
+    ThreeOfAKind,
+    TwoPairs,
+)
+from equty import _known_cards
+from evaluator import _STRAIGHT_HIGH_ARRAY
+
+# Точное распределение итоговой комбинации руки к риверу: перебираются все
+# расклады недостающих карт стола. Расклады, переходящие друг в друга при
+# перестановке мастей, не меняющей известные карты, дают одну и ту же комбинацию,
+# поэтому оценивается только один расклад из каждой такой орбиты - с весом,
+# равным размеру орбиты.
+
+_SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+# номера комбинаций (Combination.value) от младшей к старшей
+_VALUES = sorted(Comb.value for Comb in Combination.list.values())
+_POPCOUNT = np.array([m.bit_count() for m in range(1 << 13)], dtype=np.int8)
+# маски достоинств по числу карт в них
+_MASKS_BY_SIZE = [np.flatnonzero(_POPCOUNT == n) for n in range(6)]
+
+
+@dataclass(frozen=True)
+class HandOdds:
+    """Итоговая комбинация руки к риверу. current - класс комбинации из уже
+    известных карт, counts - число раскладов недостающих карт стола, после которых
+    рука заканчивается каждым классом комбинации (все классы, от младшего к
+    старшему), runouts - число всех раскладов, evaluated - сколько раскладов
+    пришлось оценить после отождествления симметричных по мастям."""
+
+    current: Type[Combination]
+    counts: dict[Type[Combination], int]
+    runouts: int
+    evaluated: int
+
+    @property
+    def distribution(self) -> dict[Type[Combination], float]:
+        """Вероятность закончить раздачу каждым классом комбинации"""
+        return {Comb: n / self.runouts for Comb, n in self.counts.items()}
+
+    @property
+    def improve(self) -> dict[Type[Combination], float]:
+        """Вероятность улучшиться к риверу до каждого класса старше текущего"""
+        return {
+            Comb: p
+            for Comb, p in self.distribution.items()
+            if Comb.value > self.current.value
+        }
+
+    @property
+    def improvement(self) -> float:
+        """Вероятность закончить раздачу комбинацией старше текущей"""
+        return sum(self.improve.values())
+
+    def at_least(self, Comb: Type[Combination]) -> float:
+        """Вероятность закончить раздачу комбинацией класса Comb или старше"""
+        return (
+            sum(n for Other, n in self.counts.items() if Other.value >= Comb.value)
+            / self.runouts
+        )
+
+
+def _canonical(known: tuple[int, ...]) -> tuple[int, ...]:
+    """Представитель известных карт с точностью до перестановки мастей: от нее
+    распределение не зависит, поэтому кэш общий для всех таких наборов"""
+    return min(
+        tuple(sorted(c & ~3 | perm[c & 3] for c in known))
+        for perm in _SUIT_PERMUTATIONS
+    )
+
+
+def _suit_groups(known: tuple[int, ...]) -> list[list[int]]:
+    """Масти с одинаковыми достоинствами известных карт: перестановки мастей внутри
+    каждой группы (и только они) не меняют известные карты"""
+    groups = dict[int, list[int]]()
+    for suit in range(4):
+        groups.setdefault(_suit_mask(known, suit), []).append(suit)
+    return [suits for suits in groups.values() if len(suits) > 1]
+
+
+def _suit_mask(ids: Iterable[int], suit: int) -> int:
+    return sum(1 << (c >> 2) for c in ids if c & 3 == suit)
+
+
+def _categories(a: np.ndarray, b: np.ndarray, c: np.ndarray, d: np.ndarray):
+    """Номера комбинаций (Combination.value) по маскам достоинств мастей - то же,
+    что classify, но векторно и без полей комбинации"""
+    m1 = a | b | c | d
+    m2 = a & b | a & c | a & d | b & c | b & d | c & d
+    m3 = a & b & c | a & b & d | a & c & d | b & c & d
+    m4 = a & b & c & d
+    flush = np.zeros(len(a), dtype=bool)
+    straightFlush = np.zeros(len(a), dtype=bool)
+    for mask in (a, b, c, d):
+        flush |= _POPCOUNT[mask] >= 5
+        straightFlush |= _STRAIGHT_HIGH_ARRAY[mask] > 0
+    return np.select(
+        (
+            straightFlush,
+            m4 > 0,
+            (m3 > 0) & (_POPCOUNT[m2] >= 2),
+            flush,
+            _STRAIGHT_HIGH_ARRAY[m1] > 0,
+            m3 > 0,
+            _POPCOUNT[m2] >= 2,
+            m2 > 0,
+        ),
+        (
+            StraightFlush.value,
+            FourOfAKind.value,
+            FullHouse.value,
+            Flush.value,
+            Straight.value,
+            ThreeOfAKind.value,
+            TwoPairs.value,
+            Pair.value,
+        ),
+        HighCard.value,
+    )
+
+
+@lru_cache(maxsize=256)
+def _class_counts(known: tuple[int, ...]) -> tuple[np.ndarray, int]:
+    """Число раскладов недостающих карт стола для каждого номера комбинации и
+    число оцененных раскладов.
+
+    Расклад задается масками достоинств, добавленных в каждую масть. Они
+    перебираются по составам - сколько карт приходит в каждую масть - как
+    декартово произведение подходящих масок мастей. Из орбиты берется расклад, у
+    которого в каждой группе взаимозаменяемых мастей пары (число карт, маска) не
+    возрастают; размер орбиты - число разных перестановок масок в группах."""
+    k = 7 - len(known)
+    knownMasks = [_suit_mask(known, suit) for suit in range(4)]
+    free = [
+        [sizes[sizes & mask == 0] for sizes in _MASKS_BY_SIZE[: k + 1]]
+        for mask in knownMasks
+    ]
+    groups = _suit_groups(known)
+
+    counts = np.zeros(_VALUES[-1] + 1, dtype=np.int64)
+    evaluated = 0
+    for sizes in product(range(k + 1), repeat=4):
+        if sum(sizes) != k or any(
+            sizes[s] < sizes[t] for suits in groups for s, t in pairwise(suits)
+        ):
+            continue
+        grid = np.meshgrid(*(free[s][n] for s, n in enumerate(sizes)), indexing="ij")
+        masks = np.stack(grid, axis=-1).reshape(-1, 4)
+        keep = np.ones(len(masks), dtype=bool)
+        for suits in groups:
+            for s, t in pairwise(suits):
+                if sizes[s] == sizes[t]:
+                    keep &= masks[:, s] >= masks[:, t]
+        masks = masks[keep]
+
+        weights = np.ones(len(masks), dtype=np.int64)
+        for suits in groups:
+            group = masks[:, suits]
+            repeats = np.ones(len(masks), dtype=np.int64)
+            for i in range(1, len(suits)):
+                repeats *= 1 + (group[:, :i] == group[:, i : i + 1]).sum(axis=1)
+            weights *= factorial(len(suits)) // repeats
+
+        categories = _categories(*(masks[:, s] | knownMasks[s] for s in range(4)))
+        counts += np.bincount(categories, weights, minlength=len(counts)).astype(
+            np.int64
+        )
+        evaluated += len(masks)
+    counts.flags.writeable = False
+    return counts, evaluated
+
+
+def hand_odds(hand: Collection[Card], table: Collection[Card] = ()) -> HandOdds:
+    """Точное распределение итоговой комбинации руки hand (две карты) при столе
+    table (0-5 карт) по всем раскладам недостающих карт стола"""
+    if len(hand) != 2:
+        raise ValueError("hand must have 2 cards")
+    if len(table) > 5:
+        raise ValueError("table must have at most 5 cards")
+    handIds, tableIds = _known_cards(hand, table)
+    counts, evaluated = _class_counts(_canonical(handIds + tableIds))
+    return HandOdds(
+        type(Combination.find_highest(CardSet([*hand, *table]))),
+        {Combination.by_value(value): int(counts[value]) for value in _VALUES},
+        comb(50 - len(table), 5 - len(table)),
+        evaluated,
+    )
+
+
+__all__ = ["HandOdds", "hand_odds"]
@@ -0,0 +1,370 @@
+import os
+from argparse import ArgumentParser
+from itertools import combinations, permutations
+from typing import Optional, Sequence, cast
+
+import numpy as np
+
+from rank_table import BINOMIAL, DEFAULT_DIR, _colex_combinations, lookup_batch
+from showdown import pot_shares, rank_seats
+from strength import COMBOS, _GROUPS, _combo_ranks
+
+# Таблица префлоп-эквити для 169 классов стартовых рук. Классы нумеруются по
+# сетке 13x13 (строки и столбцы - от туза к двойке): пары на диагонали,
+# одномастные руки - над ней, разномастные - под ней.
+DEFAULT_PATH = os.path.join(DEFAULT_DIR, "preflop.npz")
+MAX_PLAYERS = 9
+
+_VALUES = "23456789TJQKA"
+# доли хранятся в фиксированной точке uint16
+_SCALE = np.iinfo(np.uint16).max
+_SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+
+
+def hand_class(a: int, b: int) -> int:
+    """Класс стартовой руки из двух карт (Card.to_int)"""
+    i, j = 12 - max(a, b) // 4, 12 - min(a, b) // 4
+    if a % 4 == b % 4 and i != j:
+        return i * 13 + j
+    return j * 13 + i
+
+
+def class_name(index: int) -> str:
+    i, j = divmod(index, 13)
+    high, low = _VALUES[12 - min(i, j)], _VALUES[12 - max(i, j)]
+    if i == j:
+        return high + low
+    return high + low + ("s" if i < j else "o")
+
+
+def representative(index: int) -> tuple[int, int]:
+    """Одна конкретная рука класса: остальные получаются из нее перестановкой мастей"""
+    i, j = divmod(index, 13)
+    high, low = 12 - min(i, j), 12 - max(i, j)
+    return high * 4, low * 4 + (0 if i < j else 1)
+
+
+def _permute(card: int, perm: Sequence[int]) -> int:
+    return card & ~3 | perm[card & 3]
+
+
+def _villain_orbits(hero: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+    """Руки соперника, не пересекающиеся с hero, с точностью до перестановок мастей,
+    которые не меняют hero. Возвращает представителей орбит и размеры орбит."""
+    stabilizer = [
+        perm
+        for perm in _SUIT_PERMUTATIONS
+        if {_permute(c, perm) for c in hero} == set(hero)
+    ]
+    orbits = dict[tuple[int, int], int]()
+    for villain in combinations(sorted(set(range(52)) - set(hero)), 2):
+        canonical = min(
+            cast(tuple[int, int], tuple(sorted(_permute(c, perm) for c in villain)))
+            for perm in stabilizer
+        )
+        orbits[canonical] = orbits.get(canonical, 0) + 1
+    return np.array(list(orbits.keys())), np.array(list(orbits.values()))
+
+
+def _heads_up_row(
+    hero_class: int, boards: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    """Доли выигрышей и ничьих класса hero_class против каждого из 169 классов
+    по boards случайным столам на каждую руку соперника"""
+    hero = representative(hero_class)
+    villains, weights = _villain_orbits(hero)
+    pool = np.delete(np.arange(52), hero)
+    allBoards = pool[np.argsort(rng.random((boards, len(pool))), axis=1)[:, :5]]
+
+    wins = np.zeros(len(villains))
+    ties = np.zeros(len(villains))
+    counts = np.zeros(len(villains))
+    chunk = max(1, 2000000 // len(villains))
+    for start in range(0, len(allBoards), chunk):
+        board = allBoards[start : start + chunk]
+        n = len(board)
+        heroRanks = lookup_batch(np.hstack((board, np.broadcast_to(hero, (n, 2)))))
+
+        # столы, содержащие карты соперника, для него не считаются
+        onBoard = np.zeros((n, 52), dtype=bool)
+        np.put_along_axis(onBoard, board, True, axis=1)
+        valid = ~(onBoard[:, villains[:, 0]] | onBoard[:, villains[:, 1]]).T
+
+        villainRanks = np.zeros((len(villains), n), dtype=np.int64)
+        villainRanks[valid] = lookup_batch(
+            np.concatenate(
+                (
+                    np.broadcast_to(board, (len(villains), n, 5)),
+                    np.broadcast_to(villains[:, None, :], (len(villains), n, 2)),
+                ),
+                axis=2,
+            )[valid]
+        )
+
+        wins += ((heroRanks > villainRanks) & valid).sum(axis=1)
+        ties += ((heroRanks == villainRanks) & valid).sum(axis=1)
+        counts += valid.sum(axis=1)
+
+    classes = np.array([hand_class(a, b) for a, b in villains.tolist()])
+    classWeight = np.bincount(classes, weights=weights, minlength=169)
+    win = np.bincount(classes, weights=weights * wins / counts, minlength=169)
+    tie = np.bincount(classes, weights=weights * ties / counts, minlength=169)
+    return win / classWeight, tie / classWeight
+
+
+def _canonical_boards() -> tuple[np.ndarray, np.ndarray]:
+    """Столы из 5 карт с точностью до перестановки мастей: представители орбит
+    (по возрастанию размера орбиты) и размеры орбит"""
+    boards = _colex_combinations(52, 5).astype(np.int64)
+    positions = np.arange(1, 6)
+    key = np.full(len(boards), np.iinfo(np.int64).max)
+    for perm in _SUIT_PERMUTATIONS:
+        permuted = np.sort(boards & ~3 | np.array(perm)[boards & 3], axis=1)
+        np.minimum(key, BINOMIAL[permuted, positions].sum(axis=1), out=key)
+    _, first, sizes = np.unique(key, return_index=True, return_counts=True)
+    order = np.argsort(sizes, kind="stable")
+    return boards[first[order]], sizes[order]
+
+
+def _heads_up_exact(chunk=64) -> tuple[np.ndarray, np.ndarray]:
+    """Точные доли выигрышей и ничьих 169x169 по всем столам.
+
+    Перебор идет по столам, а не по парам рук: на каждом столе ранги всех 1326
+    рук считает strength._combo_ranks, и по ним сразу для всех пар классов
+    считается, сколько рук одного класса старше рук другого. Класс руки не
+    меняется при перестановке мастей, поэтому из каждой орбиты столов берется один
+    стол с весом, равным ее размеру (134459 столов вместо 2598960).
+
+    На столе руки класса A старше рук класса B в sum_r H[A, r] * C[B, r] парах,
+    где H - число рук класса с (сжатым) рангом r, C - с рангом ниже r; для пачки
+    столов это одно произведение матриц. Из него вычитаются пары рук с общей
+    картой: они попадают в группу этой карты (strength._GROUPS), и такие пары
+    считаются попарным сравнением внутри групп. Ничьи получаются как
+    1 - выигрыши - проигрыши."""
+    classes = np.array([hand_class(a, b) for a, b in COMBOS.tolist()])
+    groupClasses = classes[_GROUPS]
+    groupPairs = (groupClasses[:, :, None] * 169 + groupClasses[:, None, :]).ravel()
+
+    less = np.zeros((169, 169))
+    groupLess = np.zeros(groupPairs.shape)
+    boards, sizes = _canonical_boards()
+    # в пачке - столы с одинаковым размером орбиты
+    starts = np.flatnonzero(np.diff(sizes, prepend=0))
+    for begin, end in zip(starts, (*starts[1:], len(boards))):
+        for start in range(begin, end, chunk):
+            board = boards[start : min(start + chunk, end)]
+            n, size = len(board), sizes[start]
+            ranks = _combo_ranks(board)
+
+            # сжатые номера рангов внутри стола: 0..R-1
+            order = np.argsort(ranks, axis=1)
+            ordered = np.take_along_axis(ranks, order, axis=1)
+            newRun = np.ones(ordered.shape, dtype=bool)
+            newRun[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+            dense = np.empty_like(order)
+            np.put_along_axis(dense, order, np.cumsum(newRun, axis=1) - 1, axis=1)
+            r = int(dense.max()) + 1
+
+            rows, combos = np.nonzero(ranks >= 0)
+            cells = (rows * 169 + classes[combos]) * r + dense[rows, combos]
+            hist = np.bincount(cells, minlength=n * 169 * r).reshape(n, 169, r)
+            hist = hist.astype(np.float64)
+            below = np.cumsum(hist, axis=2) - hist
+            less += size * (
+                hist.transpose(1, 0, 2).reshape(169, -1)
+                @ below.transpose(1, 0, 2).reshape(169, -1).T
+            )
+
+            # у рук, пересекающихся со столом, ранг -1: слева такая рука не старше
+            # ни одной, справа ее заменяет максимум - и ее не старше ни одна
+            grouped = ranks[:, _GROUPS].astype(np.int32)
+            other = np.where(grouped >= 0, grouped, np.iinfo(np.int32).max)
+            groupLess += (
+                size * (grouped[..., :, None] > other[..., None, :]).sum(axis=0).ravel()
+            )
+
+    less -= np.bincount(groupPairs, weights=groupLess, minlength=169 * 169).reshape(
+        169, 169
+    )
+    # пар рук без общих карт у каждой пары классов - на C(48, 5) столах каждая
+    masks = (np.uint64(1) << COMBOS.astype(np.uint64)).sum(axis=1, dtype=np.uint64)
+    disjoint = (masks[:, None] & masks[None, :]) == 0
+    pairs = np.bincount(
+        (classes[:, None] * 169 + classes[None, :])[disjoint], minlength=169 * 169
+    ).reshape(169, 169)
+    win = less / (pairs * BINOMIAL[48, 5])
+    return win, 1 - win - win.T
+
+
+def _multiway_row(
+    hero_class: int, num_of_players: int, trials: int, rng: np.random.Generator
+) -> tuple[float, float, float]:
+    """Доли выигрышей и ничьих и эквити класса против num_of_players - 1 случайных рук"""
+    hero = representative(hero_class)
+    pool = np.delete(np.arange(52), hero)
+    n_others = num_of_players - 1
+    dealt = pool[
+        np.argsort(rng.random((trials, len(pool))), axis=1)[:, : 5 + 2 * n_others]
+    ]
+    holes = np.concatenate(
+        (
+            np.broadcast_to(hero, (trials, 1, 2)),
+            dealt[:, 5:].reshape(trials, n_others, 2),
+        ),
+        axis=1,
+    )
+    ranks = rank_seats(dealt[:, :5], holes)
+    best = ranks[:, 1:].max(axis=1)
+    return (
+        float((ranks[:, 0] > best).mean()),
+        float((ranks[:, 0] == best).mean()),
+        float(pot_shares(ranks)[:, 0].mean()),
+    )
+
+
+def _fixed(values: np.ndarray) -> np.ndarray:
+    """Доли в фиксированной точке для хранения"""
+    return np.round(values * _SCALE).astype(np.uint16)
+
+
+def build(
+    path: Optional[str] = None,
+    boards: Optional[int] = None,
+    multiway_trials=20000,
+    seed: Optional[int] = 0,
+) -> str:
+    """Строит таблицу: 169x169 для игры один на один - точно, перебором всех столов
+    (около двух минут с таблицами rank_table; boards - вместо этого столько
+    случайных столов на каждую руку соперника), и 169 x (3..MAX_PLAYERS)
+    Монте-Карло для нескольких соперников"""
+    path = path or DEFAULT_PATH
+    rng = np.random.default_rng(seed)
+
+    if boards is None:
+        win, tie = _heads_up_exact()
+    else:
+        win = np.zeros((169, 169))
+        tie = np.zeros((169, 169))
+        for hero in range(169):
+            win[hero], tie[hero] = _heads_up_row(hero, boards, rng)
+
+    multiWin = np.zeros((169, MAX_PLAYERS + 1))
+    multiTie = np.zeros((169, MAX_PLAYERS + 1))
+    multiShare = np.zeros((169, MAX_PLAYERS + 1))
+    for hero in range(169):
+        for players in range(3, MAX_PLAYERS + 1):
+            (
+                multiWin[hero, players],
+                multiTie[hero, players],
+                multiShare[hero, players],
+            ) = _multiway_row(hero, players, multiway_trials, rng)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            win=_fixed(win),
+            tie=_fixed(tie),
+            multi_win=_fixed(multiWin),
+            multi_tie=_fixed(multiTie),
+            multi_share=_fixed(multiShare),
+            exact=np.array(boards is None),
+        )
+    os.replace(tmp_path, path)
+    return path
+
+
+class PreflopTable:
+    """Загруженная таблица префлоп-эквити"""
+
+    win: np.ndarray
+    tie: np.ndarray
+    multi_win: np.ndarray
+    multi_tie: np.ndarray
+    multi_share: np.ndarray
+
+    exact: bool
+    """Таблица один на один получена точным перебором, а не по случайным столам"""
+
+    combos: np.ndarray
+    """combos[a, b] - число рук класса b, не пересекающихся с рукой класса a"""
+
+    def __init__(self, path: str):
+        with np.load(path) as data:
+            for name in ("win", "tie", "multi_win", "multi_tie", "multi_share"):
+                setattr(self, name, data[name] / _SCALE)
+            self.exact = "exact" in data.files and bool(data["exact"])
+
+        pairs = np.array(list(combinations(range(52), 2)))
+        classes = np.array([hand_class(a, b) for a, b in pairs.tolist()])
+        self.combos = np.zeros((169, 169))
+        for hero in range(169):
+            disjoint = ~np.isin(pairs, representative(hero)).any(axis=1)
+            self.combos[hero] = np.bincount(classes[disjoint], minlength=169)
+
+    def matchup(self, hero_class: int, villain_class: int) -> tuple[float, float]:
+        """Доли выигрышей и ничьих класса против класса"""
+        return (
+            float(self.win[hero_class, villain_class]),
+            float(self.tie[hero_class, villain_class]),
+        )
+
+    def equity(self, a: int, b: int, num_of_players: int) -> tuple[float, float, float]:
+        """Доли выигрышей и ничьих и эквити (доля банка) руки (a, b)
+        против num_of_players - 1 случайных рук"""
+        hero = hand_class(a, b)
+        if num_of_players == 2:
+            weights = self.combos[hero]
+            win = float(weights @ self.win[hero] / weights.sum())
+            tie = float(weights @ self.tie[hero] / weights.sum())
+            # один на один ничья - это всегда дележ банка пополам
+            return win, tie, win + tie / 2
+        return (
+            float(self.multi_win[hero, num_of_players]),
+            float(self.multi_tie[hero, num_of_players]),
+            float(self.multi_share[hero, num_of_players]),
+        )
+
+
+_loaded: dict[str, Optional[PreflopTable]] = {}
+
+
+def get_table(path: Optional[str] = None) -> Optional[PreflopTable]:
+    """Таблица из файла по умолчанию, если она была построена"""
+    path = path or DEFAULT_PATH
+    if path not in _loaded:
+        _loaded[path] = PreflopTable(path) if os.path.exists(path) else None
+    return _loaded[path]
+
+
+__all__ = [
+    "MAX_PLAYERS",
+    "PreflopTable",
+    "build",
+    "class_name",
+    "get_table",
+    "hand_class",
+    "representative",
+]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build the preflop equity table")
+    parser.add_argument(
+        "--boards",
+        type=int,
+        help="sample this many boards per matchup instead of enumerating all boards",
+    )
+    parser.add_argument("--multiway-trials", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("path", nargs="?", help="output file")
+    args = parser.parse_args()
+
+    path = build(
+        args.path,
+        args.boards,
+        args.multiway_trials,
+        args.seed,
+    )
+    print(f"Table written to {path}")
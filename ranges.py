@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Collection, Iterable, Optional, Sequence
+
+import numpy as np
+
+from card import Card
+from showdown import pot_shares, rank_seats
+
+_VALUES = "23456789TJQKA"
+
+Combo = tuple[int, int]
+"""Стартовая рука - пара номеров карт (Card.to_int), старшая первой"""
+
+
+def _combo(a: int, b: int) -> Combo:
+    return (a, b) if a > b else (b, a)
+
+
+def combo_str(combo: Combo) -> str:
+    return " ".join(map(str, map(Card.from_int, combo)))
+
+
+def _value_combos(high: int, low: int, kind: str) -> list[Combo]:
+    """Все комбо с достоинствами high и low (0 - двойка, 12 - туз).
+    kind: 's' - одномастные, 'o' - разномастные, '' - любые."""
+    if high == low:
+        return [
+            _combo(high * 4 + s1, low * 4 + s2) for s1, s2 in combinations(range(4), 2)
+        ]
+    return [
+        _combo(high * 4 + s1, low * 4 + s2)
+        for s1 in range(4)
+        for s2 in range(4)
+        if kind == "" or (kind == "s") == (s1 == s2)
+    ]
+
+
+def _parse_hand(token: str) -> tuple[int, int, str]:
+    if len(token) not in (2, 3) or any(c not in _VALUES for c in token[:2]):
+        raise ValueError(f"Bad hand: {token}")
+    high, low = sorted(map(_VALUES.index, token[:2]), reverse=True)
+    kind = token[2:]
+    if kind not in ("", "s", "o") or (high == low and kind):
+        raise ValueError(f"Bad hand: {token}")
+    return high, low, kind
+
+
+def _parse_token(token: str) -> list[Combo]:
+    # конкретная рука: ASKS
+    if len(token) == 4 and token[1].upper() in "SCDH" and token[3].upper() in "SCDH":
+        firstCard = Card.parse(token[:2].upper())
+        secondCard = Card.parse(token[2:].upper())
+        if firstCard == secondCard:
+            raise ValueError(f"Bad hand: {token}")
+        return [_combo(firstCard.to_int(), secondCard.to_int())]
+
+    if token.endswith("+"):
+        high, low, kind = _parse_hand(token[:-1])
+        if high == low:
+            # QQ+ - пары от QQ до AA
+            pairs = range(low, 13)
+            return [c for v in pairs for c in _value_combos(v, v, "")]
+        # A5s+ - старшая карта фиксирована, младшая - до старшей
+        return [c for v in range(low, high) for c in _value_combos(high, v, kind)]
+
+    if "-" in token:
+        first, last = map(_parse_hand, token.split("-", 1))
+        if first[2] != last[2]:
+            raise ValueError(f"Bad range: {token}")
+        if first[0] == first[1] and last[0] == last[1]:
+            # 99-66 - отрезок пар
+            lo, hi = sorted((first[0], last[0]))
+            return [c for v in range(lo, hi + 1) for c in _value_combos(v, v, "")]
+        if first[0] == last[0]:
+            # KQo-K9o - старшая карта фиксирована
+            lo, hi = sorted((first[1], last[1]))
+            return [
+                c
+                for v in range(lo, hi + 1)
+                for c in _value_combos(first[0], v, first[2])
+            ]
+        if first[0] - first[1] == last[0] - last[1]:
+            # 76s-54s - коннекторы с одинаковым зазором
+            gap = first[0] - first[1]
+            lo, hi = sorted((first[0], last[0]))
+            return [
+                c
+                for v in range(lo, hi + 1)
+                for c in _value_combos(v, v - gap, first[2])
+            ]
+        raise ValueError(f"Bad range: {token}")
+
+    return _value_combos(*_parse_hand(token))
+
+
+class Range:
+    """Диапазон рук: вес каждой стартовой руки (комбо)"""
+
+    combos: dict[Combo, float]
+
+    def __init__(self, combos: dict[Combo, float]) -> None:
+        self.combos = {c: w for c, w in combos.items() if w > 0}
+
+    @staticmethod
+    def parse(rangestr: str) -> "Range":
+        """Разбор стандартной записи вида "QQ+, AKs, 76s-54s, AQo:0.5, ASKH".
+        Вес комбо указывается через двоеточие, по умолчанию - 1."""
+        combos = dict[Combo, float]()
+        for token in filter(None, map(str.strip, rangestr.split(","))):
+            hands, _, weight = token.partition(":")
+            for combo in _parse_token(hands.strip()):
+                combos[combo] = float(weight) if weight else 1.0
+        return Range(combos)
+
+    @staticmethod
+    def from_cards(cards: Iterable[Card]) -> "Range":
+        a, b = map(Card.to_int, cards)
+        return Range({_combo(a, b): 1.0})
+
+    @staticmethod
+    def random() -> "Range":
+        """Любая из 1326 стартовых рук с равным весом"""
+        return Range({_combo(a, b): 1.0 for a, b in combinations(range(52), 2)})
+
+    def __len__(self):
+        return self.combos.__len__()
+
+    def __str__(self) -> str:
+        return ", ".join(f"{combo_str(c)}:{w:g}" for c, w in self.combos.items())
+
+
+@dataclass
+class RangeEquity:
+    """Доля банка диапазона hero и доля банка каждого его комбо"""
+
+    equity: float
+    combos: dict[str, float]
+    trials: int
+
+
+def range_equity(
+    hero: Range,
+    villains: Sequence[Range],
+    table: Collection[Card] = (),
+    n=20000,
+    seed: Optional[int] = None,
+) -> RangeEquity:
+    """Эквити диапазона против диапазонов соперников методом Монте-Карло.
+    Руки игроков выбираются с учетом весов и удаления карт: наборы, в которых
+    карты повторяются, отбрасываются и выбираются заново. При ничьей банк делится."""
+    rng = np.random.default_rng(seed)
+    tableIds = np.fromiter(map(Card.to_int, table), int)
+    tableMask = np.zeros(52, dtype=bool)
+    tableMask[tableIds] = True
+
+    def prepare(r: Range) -> tuple[np.ndarray, np.ndarray]:
+        combos = np.array([c for c in r.combos if not tableMask[list(c)].any()], int)
+        if not len(combos):
+            raise ValueError("Range is empty after removing board cards")
+        weights = np.array([r.combos[tuple(c)] for c in combos.tolist()])
+        return combos.reshape(-1, 2), weights / weights.sum()
+
+    players = list(map(prepare, (hero, *villains)))
+
+    # rows[i, p] - номер комбо игрока p в испытании i
+    rows = np.zeros((n, len(players)), dtype=int)
+    pending = np.arange(n)
+    for _ in range(1000):
+        for p, (combos, weights) in enumerate(players):
+            rows[pending, p] = rng.choice(len(combos), len(pending), p=weights)
+        holes = np.concatenate(
+            [players[p][0][rows[pending, p]] for p in range(len(players))], axis=1
+        )
+        conflict = (np.diff(np.sort(holes, axis=1), axis=1) == 0).any(axis=1)
+        pending = pending[conflict]
+        if not len(pending):
+            break
+    else:
+        raise ValueError("Ranges are (almost) incompatible")
+
+    holes = np.stack(
+        [players[p][0][rows[:, p]] for p in range(len(players))], axis=1
+    )  # (n, players, 2)
+
+    # остаток стола - первые карты случайной перестановки неиспользованных карт
+    keys = rng.random((n, 52))
+    keys[:, tableIds] = np.inf
+    np.put_along_axis(keys, holes.reshape(n, -1), np.inf, axis=1)
+    board = np.hstack(
+        (
+            np.broadcast_to(tableIds, (n, len(tableIds))),
+            np.argsort(keys, axis=1)[:, : 5 - len(tableIds)],
+        )
+    )
+
+    share = pot_shares(rank_seats(board, holes))[:, 0]
+
+    heroCombos = players[0][0]
+    totals = np.bincount(rows[:, 0], weights=share, minlength=len(heroCombos))
+    counts = np.bincount(rows[:, 0], minlength=len(heroCombos))
+    return RangeEquity(
+        float(share.mean()),
+        {
+            combo_str(tuple(c)): float(total / count)
+            for c, total, count in zip(heroCombos.tolist(), totals, counts)
+            if count
+        },
+        n,
+    )
+
+
+__all__ = ["Combo", "Range", "RangeEquity", "combo_str", "range_equity"]
@@ -0,0 +1,213 @@
+import os
+from argparse import ArgumentParser
+from math import comb
+from operator import getitem
+from typing import Any, Optional, Sequence, cast
+
+import numpy as np
+
+from evaluator import (
+    _CARD_PRIMES,
+    _FLUSH,
+    _get_rank_table,
+    evaluate_batch,
+    evaluate_ints,
+)
+
+# Таблица рангов всех наборов из k карт, упорядоченных по комбинаторному
+# номеру (colex): набор c0 < c1 < ... < c(k-1) имеет номер sum(C(ci, i + 1)).
+# В файле хранятся uint16-индексы в отсортированный массив рангов evaluator,
+# который лежит рядом в отдельном маленьком файле.
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+_BINOM = tuple(tuple(comb(n, k) for k in range(8)) for n in range(53))
+# то же для векторных вычислений: BINOMIAL[n, k] = C(n, k), n <= 52, k <= 7
+BINOMIAL = np.array(_BINOM, dtype=np.int64)
+BINOMIAL.setflags(write=False)
+# слагаемые комбинаторного номера для i-й по возрастанию карты
+_COLEX = tuple(tuple(comb(c, i + 1) for c in range(52)) for i in range(7))
+
+
+def default_path(k: int = 7) -> str:
+    return os.path.join(DEFAULT_DIR, f"rank{k}.npy")
+
+
+def _ranks_path(path: str) -> str:
+    return path[: -len(".npy")] + "_ranks.npy"
+
+
+def colex_index(ids: Sequence[int]) -> int:
+    """Комбинаторный номер набора карт (в кодировке Card.to_int)"""
+    return sum(map(getitem, _COLEX, sorted(ids)))
+
+
+def _colex_combinations(n: int, k: int) -> np.ndarray:
+    """Все k-сочетания из range(n) в colex-порядке. Сочетания из range(m), m < n,
+    образуют префикс результата длины C(m, k)."""
+    combos = np.zeros((1, 0), dtype=np.int8)
+    for j in range(1, k + 1):
+        combos = np.concatenate(
+            [
+                np.column_stack(
+                    (combos[: _BINOM[top][j - 1]], np.full(_BINOM[top][j - 1], top))
+                )
+                for top in range(j - 1, n)
+            ]
+        ).astype(np.int8)
+    return combos
+
+
+def build(path: Optional[str] = None, k: int = 7) -> str:
+    """Перебирает все C(52, k) наборов и записывает таблицу рангов на диск"""
+    assert 5 <= k <= 7, "supported hand sizes are 5..7"
+    path = path or default_path(k)
+
+    # массив всех возможных рангов: по нему ранги сжимаются до uint16
+    rank_table = _get_rank_table()
+    ranks = np.unique(np.array([*rank_table.values(), *_FLUSH], dtype=np.int64))
+    assert len(ranks) <= np.iinfo(np.uint16).max
+    products = np.fromiter(rank_table.keys(), np.int64, len(rank_table))
+    order = np.argsort(products)
+    products = products[order]
+    product_dense = np.searchsorted(
+        ranks, np.fromiter(rank_table.values(), np.int64, len(rank_table))[order]
+    ).astype(np.uint16)
+    flush_dense = np.searchsorted(ranks, np.array(_FLUSH, dtype=np.int64))
+    flush_dense[np.array(_FLUSH) == 0] = -1
+
+    # для всех 5-карточных "хвостов" заранее считаются произведение простых
+    # и маски мастей (по 16 бит на масть)
+    card_primes = np.array(_CARD_PRIMES, dtype=np.int64)
+    card_bits = np.array([1 << (16 * (i & 3) + (i >> 2)) for i in range(52)], np.uint64)
+    base = _colex_combinations(52 - (k - 5), 5)
+    base_products = card_primes[base].prod(axis=1)
+    base_masks = np.bitwise_or.reduce(card_bits[base], axis=1)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    table = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.uint16, shape=(_BINOM[52][k],)
+    )
+
+    def fill(top: tuple[int, ...]):
+        # наборы вида (5 карт меньше top[0]) + top занимают непрерывный отрезок таблицы
+        rows = _BINOM[top[0] if top else 52][5]
+        offset = sum(_BINOM[c][5 + j + 1] for j, c in enumerate(top))
+        product = base_products[:rows] * int(np.prod(card_primes[list(top)]))
+        mask = base_masks[:rows] | np.bitwise_or.reduce(card_bits[list(top)])
+
+        dense = product_dense[np.searchsorted(products, product)]
+        for suit in range(4):
+            flush = flush_dense[(mask >> np.uint64(16 * suit)) & np.uint64(0x1FFF)]
+            np.copyto(dense, flush, where=flush >= 0, casting="unsafe")
+        table[offset : offset + rows] = dense
+
+    if k == 5:
+        fill(())
+    elif k == 6:
+        for c5 in range(5, 52):
+            fill((c5,))
+    else:
+        for c6 in range(6, 52):
+            for c5 in range(5, c6):
+                fill((c5, c6))
+
+    table.flush()
+    del table
+    with open(f"{tmp_path}.ranks", "wb") as f:
+        np.save(f, ranks)
+    os.replace(f"{tmp_path}.ranks", _ranks_path(path))
+    os.replace(tmp_path, path)
+    return path
+
+
+class RankTable:
+    """Таблица рангов, отображенная в память только для чтения: все процессы
+    на машине используют одну копию из страничного кэша."""
+
+    k: int
+    table: np.ndarray
+    ranks: np.ndarray
+
+    def __init__(self, path: str):
+        self.table = np.load(path, mmap_mode="r")
+        self.ranks = np.load(_ranks_path(path))
+        self.k = next(k for k in range(5, 8) if _BINOM[52][k] == len(self.table))
+        # поэлементный доступ через memoryview обходится без создания numpy-скаляров
+        self._view = memoryview(cast(Any, self.table))
+        self._rank_list = self.ranks.tolist()
+
+    def evaluate_ints(self, ids: Sequence[int]) -> int:
+        """То же, что evaluator.evaluate_ints, но одним обращением к таблице"""
+        return self._rank_list[self._view[colex_index(ids)]]
+
+    def evaluate_batch(self, ids: np.ndarray) -> np.ndarray:
+        """Ранги для массива наборов формы (N, k) из разных карт 0..51;
+        иначе - ValueError"""
+        ids = np.sort(np.asarray(ids, dtype=np.int64), axis=1)
+        if ids.shape[1] != self.k:
+            raise ValueError(f"expected sets of {self.k} cards, got {ids.shape[1]}")
+        _check_sorted(ids)
+        index = sum(BINOMIAL[ids[:, i], i + 1] for i in range(self.k))
+        return self.ranks[self.table[index]]
+
+
+def _check_sorted(ids: np.ndarray) -> None:
+    """Проверка отсортированных по строкам наборов: карты 0..51 без повторов"""
+    if ids.size and (
+        ids[:, 0].min() < 0
+        or ids[:, -1].max() > 51
+        or (ids[:, 1:] == ids[:, :-1]).any()
+    ):
+        raise ValueError("sets must consist of distinct card ids 0..51")
+
+
+_loaded = dict[int, Optional[RankTable]]()
+
+
+def get_table(k: int = 7) -> Optional[RankTable]:
+    """Таблица для наборов из k карт из каталога по умолчанию, если она была построена"""
+    if k not in _loaded:
+        path = default_path(k)
+        _loaded[k] = RankTable(path) if os.path.exists(path) else None
+    return _loaded[k]
+
+
+def lookup(ids: Sequence[int]) -> int:
+    """Ранг набора карт: из таблицы, если она есть для такого числа карт, иначе -
+    evaluator. Карты не проверяются: они должны быть разными номерами 0..51."""
+    table = get_table(len(ids)) if 5 <= len(ids) <= 7 else None
+    if table is None:
+        return evaluate_ints(ids)
+    return table.evaluate_ints(ids)
+
+
+def lookup_batch(ids: np.ndarray) -> np.ndarray:
+    """Векторный вариант lookup для массива наборов формы (N, k). Карты наборов
+    должны быть разными номерами 0..51, иначе - ValueError."""
+    table = get_table(ids.shape[1]) if 5 <= ids.shape[1] <= 7 else None
+    if table is None:
+        _check_sorted(np.sort(ids, axis=1))
+        return evaluate_batch(ids)
+    return table.evaluate_batch(ids)
+
+
+__all__ = [
+    "BINOMIAL",
+    "RankTable",
+    "build",
+    "colex_index",
+    "default_path",
+    "get_table",
+    "lookup",
+    "lookup_batch",
+]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build the on-disk hand rank table")
+    parser.add_argument("-k", type=int, default=7, help="number of cards in a hand")
+    parser.add_argument("path", nargs="?", help="output file")
+    args = parser.parse_args()
+
+    print(f"Table written to {build(args.path, args.k)}")
@@ -0,0 +1,181 @@
+from itertools import combinations
+from math import comb
+from typing import Callable, Optional, Sequence, Union, cast
+
+import numpy as np
+
+# Способы выбрать n случайных раздач оставшейся колоды для оценки эквити.
+# Раздача - строка из n_cards карт: сначала n_board недостающих карт стола, затем
+# карты соперников. Каждый способ дает несмещенную оценку: у каждой отдельной
+# раздачи то же распределение (с точностью до порядка карт стола), что и у
+# случайной перестановки колоды, меняется
+# только зависимость между раздачами, а с ней - дисперсия среднего.
+
+Sampler = Callable[[np.ndarray, int, int, int, np.random.Generator], np.ndarray]
+
+# Простые числа - основания последовательности Холтона по измерениям
+_PRIMES = tuple(p for p in range(2, 90) if all(p % d for d in range(2, p)))
+
+
+class Dealer:
+    """Раздача k карт без возвращения частичным тасованием Фишера - Йетса: меняются
+    местами только первые k позиций колоды, а колода не восстанавливается между
+    раздачами (начало случайной перестановки случайной перестановки - снова
+    случайный набор). Колода и случайные числа хранятся в буферах, которые
+    переиспользуются, поэтому раздача не создает новых объектов."""
+
+    # сколько раздач обеспечивает один запрос случайных чисел у генератора
+    BLOCK = 1024
+
+    def __init__(
+        self, cardpool: Union[np.ndarray, Sequence[int]], rng: np.random.Generator
+    ) -> None:
+        self._pool = np.array(cardpool, dtype=np.int64)
+        self._deck = self._pool.tolist()
+        self._rng = rng
+        self._uniforms: list[float] = []
+        self._cursor = 0
+        self._rows: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+
+    def deal(self, k: int) -> list[int]:
+        """k случайных карт - первые k элементов возвращаемого списка. Это внутренний
+        буфер колоды: он действителен до следующего вызова и не должен меняться."""
+        deck = self._deck
+        m = len(deck)
+        if self._cursor + k > len(self._uniforms):
+            self._uniforms = self._rng.random(self.BLOCK * k).tolist()
+            self._cursor = 0
+        uniforms = self._uniforms
+        cursor = self._cursor
+        for j in range(k):
+            i = j + int(uniforms[cursor + j] * (m - j))
+            deck[j], deck[i] = deck[i], deck[j]
+        self._cursor = cursor + k
+        return deck
+
+    def deal_batch(self, n: int, k: int) -> np.ndarray:
+        """n независимых раздач по k карт - матрица (n, k), тасование идет
+        одновременно по всем строкам. Это вид на внутренний буфер: он действителен до
+        следующего вызова."""
+        if self._matrix is None or len(self._matrix) != n:
+            self._matrix = np.tile(self._pool, (n, 1))
+            self._rows = np.arange(n)
+        matrix, rows = self._matrix, cast(np.ndarray, self._rows)
+        m = matrix.shape[1]
+        for j in range(k):
+            picks = self._rng.integers(j, m, size=n)
+            chosen = matrix[rows, picks]
+            matrix[rows, picks] = matrix[:, j]
+            matrix[:, j] = chosen
+        return matrix[:, :k]
+
+
+def random_deals(
+    cardpool: np.ndarray, n_board: int, n_cards: int, n: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Независимые раздачи (частичное тасование Фишера - Йетса)"""
+    return Dealer(cardpool, rng).deal_batch(n, n_cards)
+
+
+def antithetic_deals(
+    cardpool: np.ndarray, n_board: int, n_cards: int, n: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Пары противоположных раздач: ключам перестановки u соответствуют ключи 1 - u,
+    то есть вторая раздача пары берет карты с другого конца той же перестановки
+    и не пересекается с первой. Пары идут подряд: строки 2i и 2i + 1."""
+    half = (n + 1) // 2
+    order = np.argsort(rng.random((half, len(cardpool))), axis=1)
+    pairs = np.stack((order[:, :n_cards], order[:, : -n_cards - 1 : -1]), axis=1)
+    return cardpool[pairs.reshape(-1, n_cards)[:n]]
+
+
+def _strata(m: int, n_board: int, n: int) -> np.ndarray:
+    """Слои - все сочетания недостающих карт стола (номера в колоде), если их не
+    больше n, иначе - первая из этих карт"""
+    if comb(m, n_board) <= n:
+        return np.array(list(combinations(range(m), n_board)), dtype=int).reshape(
+            comb(m, n_board), n_board
+        )
+    return np.arange(m).reshape(-1, 1)
+
+
+def stratified_deals(
+    cardpool: np.ndarray, n_board: int, n_cards: int, n: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Раздачи поровну по слоям: недостающие карты стола (терн и ривер после флопа,
+    ривер после терна; иначе - первая из них) пробегают все варианты по очереди,
+    остаток n распределяется по случайным разным слоям. Остальные карты -
+    случайные. Разброс, вызванный неравным числом попаданий в слои, исчезает."""
+    m = len(cardpool)
+    strata = _strata(m, n_board, n)
+    q, r = divmod(n, len(strata))
+    fixed = np.concatenate(
+        (np.tile(strata, (q, 1)), strata[rng.permutation(len(strata))[:r]])
+    )
+
+    # остальные карты - начало случайной перестановки колоды без карт слоя
+    keys = rng.random((n, m))
+    np.put_along_axis(keys, fixed, 2.0, axis=1)
+    rest = np.argsort(keys, axis=1)[:, : n_cards - fixed.shape[1]]
+    return cardpool[np.hstack((fixed, rest))]
+
+
+def _halton(n: int, dims: int, rng: np.random.Generator) -> np.ndarray:
+    """n точек последовательности Холтона в [0, 1)^dims со случайным началом
+    и случайным сдвигом по модулю 1: каждая точка равномерна, а вместе они
+    покрывают куб равномернее независимых"""
+    assert dims <= len(_PRIMES), f"at most {len(_PRIMES)} dimensions"
+    index = np.arange(n, dtype=np.int64) + int(rng.integers(1 << 20))
+    points = np.empty((n, dims))
+    for d, base in enumerate(_PRIMES[:dims]):
+        rest = index.copy()
+        value = np.zeros(n)
+        scale = 1.0
+        while rest.any():
+            scale /= base
+            value += scale * (rest % base)
+            rest //= base
+        points[:, d] = value
+    return (points + rng.random(dims)) % 1.0
+
+
+def quasi_deals(
+    cardpool: np.ndarray, n_board: int, n_cards: int, n: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Квазислучайные раздачи: j-я карта выбирается из оставшихся по j-й координате
+    точки Холтона (обратный ход тасования Фишера - Йетса)"""
+    m = len(cardpool)
+    points = _halton(n, n_cards, rng)
+    deck = np.tile(np.arange(m), (n, 1))
+    rows = np.arange(n)
+    for j in range(n_cards):
+        pick = j + (points[:, j] * (m - j)).astype(int)
+        deck[rows, j], deck[rows, pick] = deck[rows, pick], deck[rows, j]
+    return cardpool[deck[:, :n_cards]]
+
+
+SAMPLERS: dict[str, Sampler] = {
+    "random": random_deals,
+    "antithetic": antithetic_deals,
+    "stratified": stratified_deals,
+    "quasi": quasi_deals,
+}
+
+
+def get_sampler(name: str) -> Sampler:
+    if name not in SAMPLERS:
+        raise ValueError(f"Unknown sampler: {name!r}, expected one of {list(SAMPLERS)}")
+    return SAMPLERS[name]
+
+
+__all__ = [
+    "Dealer",
+    "SAMPLERS",
+    "Sampler",
+    "antithetic_deals",
+    "get_sampler",
+    "quasi_deals",
+    "random_deals",
+    "stratified_deals",
+]
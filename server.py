@@ -0,0 +1,377 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from argparse import ArgumentParser
+from bisect import bisect_left
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+import numpy as np
+
+from card import Card, CardSet
+from equty import equity_stats
+from rank_table import lookup_batch
+
+# Локальный сервис: JSON-запросы по одному на строку через TCP на localhost или
+# Unix-сокет. Запрос - {"id": ..., "op": "compare" | "equity" | "stats", ...},
+# ответ - {"id": ..., "result": ...} или {"id": ..., "error": "..."}.
+# Ответы на запросы одного соединения приходят по мере готовности, не по порядку.
+
+# Верхние границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек ответов одного типа запросов"""
+
+    counts: list[int]
+    count: int
+    total_ms: float
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": self.total_ms,
+            "buckets": {
+                str(bound): n
+                for bound, n in zip((*LATENCY_BUCKETS, "+Inf"), self.counts)
+            },
+        }
+
+
+class _MicroBatcher:
+    """Собирает запросы, пришедшие в течение window секунд (но не более max_size),
+    и обрабатывает их одним вызовом handler. handler возвращает по результату на
+    запрос; результат-исключение передается только своему запросу."""
+
+    batches: int
+
+    def __init__(
+        self,
+        handler: Callable[[list[Any]], Awaitable[list[Any]]],
+        window: float,
+        max_size: int,
+    ) -> None:
+        self._handler = handler
+        self._window = window
+        self._max_size = max_size
+        self._items: list[tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set[asyncio.Task]()
+        self.batches = 0
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._items.append((item, future))
+        if len(self._items) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self._window, self._flush
+            )
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        if items:
+            task = asyncio.create_task(self._run(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: list[tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        try:
+            results = await self._handler([item for item, _ in items])
+        except Exception as e:
+            results = [e] * len(items)
+        for (_, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def _compare_many(
+    pairs: Sequence[tuple[tuple[int, ...], tuple[int, ...]]],
+) -> list[int]:
+    """Сравнение пар наборов: наборы одного размера оцениваются одним lookup_batch"""
+    hands = [hand for pair in pairs for hand in pair]
+    ranks = np.zeros(len(hands), dtype=np.int64)
+    bySize = dict[int, list[int]]()
+    for i, hand in enumerate(hands):
+        bySize.setdefault(len(hand), []).append(i)
+    for size, indices in bySize.items():
+        ranks[indices] = lookup_batch(np.array([hands[i] for i in indices], dtype=int))
+    return np.sign(ranks[0::2] - ranks[1::2]).tolist()
+
+
+def _equity(
+    hand: tuple[int, ...],
+    table: tuple[int, ...],
+    players: int,
+    n: int,
+    seed: Optional[int],
+) -> dict[str, Any]:
+    stats = equity_stats(
+        tuple(map(Card.from_int, hand)),
+        tuple(map(Card.from_int, table)),
+        players,
+        n,
+        seed=seed,
+    )
+    return asdict(stats)
+
+
+def _parse_ids(setstr: str) -> tuple[int, ...]:
+    """Номера карт набора; карты не должны повторяться"""
+    ids = tuple(card.to_int() for card in CardSet.parse(setstr)) if setstr else ()
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate cards: {setstr}")
+    return ids
+
+
+class EquityServer:
+    """Долгоживущий сервис эквити и сравнения рук. Одинаковые запросы эквити,
+    пришедшие, пока такой же запрос еще считается, получают его результат;
+    одновременные сравнения собираются в пакеты и оцениваются одним векторным
+    проходом. Вычисления выполняются в пуле процессов; каждый запрос эквити -
+    отдельная задача пула, поэтому одновременные запросы считаются параллельно."""
+
+    latency: dict[str, LatencyHistogram]
+    coalesced: int
+
+    _inflight: dict[tuple, asyncio.Future]
+
+    def __init__(
+        self,
+        workers: Optional[int] = 1,
+        window=0.002,
+        max_batch=1000,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self._executor = executor or ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1
+        )
+        self._compare = _MicroBatcher(self._run_compare, window, max_batch)
+        self._inflight = {}
+        self._server: Optional[asyncio.Server] = None
+        self.latency = {}
+        self.coalesced = 0
+
+    async def _run_compare(self, pairs: list) -> list:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, _compare_many, pairs)
+        except Exception:
+            if len(pairs) == 1:
+                raise
+        # пакет не посчитался: каждое сравнение отдельно, чтобы ошибка одного
+        # запроса досталась только ему
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, _compare_many, [pair])
+                for pair in pairs
+            ),
+            return_exceptions=True,
+        )
+        return [r if isinstance(r, BaseException) else r[0] for r in results]
+
+    async def compare(self, first: str, second: str) -> int:
+        return await self._compare.submit((_parse_ids(first), _parse_ids(second)))
+
+    async def equity(
+        self,
+        hand: str,
+        table: str = "",
+        players=2,
+        n=5000,
+        seed: Optional[int] = None,
+    ) -> dict[str, float]:
+        args = (_parse_ids(hand), _parse_ids(table), int(players), int(n), seed)
+        key = (tuple(sorted(args[0])), tuple(sorted(args[1])), *args[2:])
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._executor, _equity, *args
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(self._inflight[key])
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "latency": {op: h.snapshot() for op, h in self.latency.items()},
+            "coalesced": self.coalesced,
+            "batches": {"compare": self._compare.batches},
+        }
+
+    async def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Ответ на один запрос"""
+        begin = time.perf_counter()
+        op = request.get("op")
+        response: dict[str, Any] = {"id": request.get("id")}
+        try:
+            if op == "compare":
+                response["result"] = await self.compare(request["a"], request["b"])
+            elif op == "equity":
+                response["result"] = await self.equity(
+                    request["hand"],
+                    request.get("table", ""),
+                    request.get("players", 2),
+                    request.get("n", 5000),
+                    request.get("seed"),
+                )
+            elif op == "stats":
+                response["result"] = self.stats()
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except Exception as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        if isinstance(op, str):
+            histogram = self.latency.setdefault(op, LatencyHistogram())
+            histogram.observe((time.perf_counter() - begin) * 1000)
+        return response
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        tasks = set[asyncio.Task]()
+
+        async def respond(line: bytes) -> None:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                response = {"id": None, "error": f"Bad request: {e}"}
+            else:
+                response = await self.handle(request)
+            writer.write(json.dumps(response).encode() + b"\n")
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(
+        self, host="127.0.0.1", port=0, path: Optional[str] = None
+    ) -> asyncio.Server:
+        """Запуск на localhost:port (port=0 - любой свободный) или на Unix-сокете path"""
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._serve_connection, path)
+        else:
+            self._server = await asyncio.start_server(
+                self._serve_connection, host, port
+            )
+        return self._server
+
+    @property
+    def address(self) -> Any:
+        assert self._server is not None, "server is not started"
+        return self._server.sockets[0].getsockname()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown()
+
+
+class ServiceError(Exception):
+    """Ошибка, которую вернул сервис"""
+
+    pass
+
+
+class Client:
+    """Клиент сервиса: запросы одного соединения можно отправлять одновременно"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._pending = dict[int, asyncio.Future]()
+        self._listener = asyncio.create_task(self._listen())
+
+    @staticmethod
+    async def connect(host="127.0.0.1", port=0, path: Optional[str] = None) -> "Client":
+        if path is not None:
+            return Client(*await asyncio.open_unix_connection(path))
+        return Client(*await asyncio.open_connection(host, port))
+
+    async def _listen(self) -> None:
+        while line := await self._reader.readline():
+            response = json.loads(line)
+            future = self._pending.pop(response["id"], None)
+            if future is None or future.done():
+                continue
+            if "error" in response:
+                future.set_exception(ServiceError(response["error"]))
+            else:
+                future.set_result(response["result"])
+        for future in self._pending.values():
+            future.set_exception(ConnectionError("connection closed"))
+
+    async def call(self, op: str, **params: Any) -> Any:
+        id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[id] = future
+        self._writer.write(json.dumps({"id": id, "op": op, **params}).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._listener.cancel()
+
+
+__all__ = ["Client", "EquityServer", "LatencyHistogram", "ServiceError"]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Local equity and hand comparison service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--window", type=float, default=0.002, help="micro-batch window, seconds"
+    )
+    args = parser.parse_args()
+
+    async def main() -> None:
+        server = EquityServer(args.workers, args.window)
+        await server.start(args.host, args.port, args.unix)
+        print(f"Listening on {args.unix or server.address}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+from typing import Collection, Sequence
+
+import numpy as np
+
+from card import Card, CardMask
+from rank_table import lookup, lookup_batch
+
+
+def showdown(
+    table: Collection[Card], hands: Sequence[Collection[Card]]
+) -> list[list[int]]:
+    """Вскрытие: номера мест (индексы в hands), сгруппированные по силе руки от
+    сильнейшей к слабейшей. Первая группа - победители; если в ней несколько мест,
+    банк делится между ними поровну."""
+    known = [*table, *(card for hand in hands for card in hand)]
+    if len(CardMask(known)) != len(known):
+        raise ValueError("Hands and table contain duplicate cards")
+
+    tableIds = tuple(map(Card.to_int, table))
+    ranks = [lookup((*tableIds, *map(Card.to_int, hand))) for hand in hands]
+    groups = dict[int, list[int]]()
+    for seat, rank in sorted(enumerate(ranks), key=lambda e: -e[1]):
+        groups.setdefault(rank, []).append(seat)
+    return list(groups.values())
+
+
+def rank_seats(board: np.ndarray, holes: np.ndarray) -> np.ndarray:
+    """Ранги рук всех мест за один вызов lookup_batch: board - (N, 5) карты стола,
+    holes - (N, players, 2) карты мест, результат - (N, players)"""
+    n, players = holes.shape[:2]
+    return lookup_batch(
+        np.concatenate(
+            (np.broadcast_to(board[:, None, :], (n, players, board.shape[1])), holes),
+            axis=2,
+        ).reshape(n * players, -1)
+    ).reshape(n, players)
+
+
+def pot_shares(ranks: np.ndarray) -> np.ndarray:
+    """Доля банка каждого места по рангам (..., players): победители делят банк поровну"""
+    best = ranks == ranks.max(axis=-1, keepdims=True)
+    return best / best.sum(axis=-1, keepdims=True)
+
+
+__all__ = ["pot_shares", "rank_seats", "showdown"]
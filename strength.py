@@ -0,0 +1,337 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import Collection, Optional
+
+import numpy as np
+
+from card import Card, CardMask
+from rank_table import BINOMIAL, get_table, lookup_batch
+
+# Сила всех 1326 стартовых рук на одном столе против одной случайной руки
+# соперника (как у compute_equity с двумя игроками): текущая сила, ожидаемая сила
+# к риверу, ее квадрат, гистограмма силы на ривере и потенциал, а также разбиение
+# рук на группы по гистограммам.
+
+# Все стартовые руки: старшая карта первой, порядок - по (старшая, младшая)
+COMBOS = np.array([(a, b) for a in range(52) for b in range(a)], dtype=np.int64)
+# Номер руки по двум картам, -1 на диагонали
+_COMBO_INDEX = np.full((52, 52), -1, dtype=np.int64)
+_COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(len(COMBOS))
+_COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(len(COMBOS))
+# Руки, содержащие карту c, - по возрастанию второй карты; рука (a, b), a > b,
+# стоит в группе a на месте b, в группе b - на месте a - 1
+_GROUPS = np.array(
+    [[_COMBO_INDEX[c, o] for o in range(52) if o != c] for c in range(52)]
+)
+
+
+@dataclass
+class BoardStrength:
+    """Показатели каждой руки COMBOS на столе board. Сила (HS) - доля банка против
+    одной случайной руки из оставшихся карт; для рук, пересекающихся со столом,
+    все значения - nan.
+    hs - текущая сила, ehs - ее математическое ожидание на ривере (равно
+    compute_equity(рука, стол, 2)), ehs2 - ожидание квадрата силы на ривере,
+    histogram - распределение силы на ривере по bins равным отрезкам [0, 1],
+    ppot и npot - вероятность обойти соперника, который сейчас впереди, и уступить
+    сопернику, который сейчас позади, к следующей карте (ничьи считаются
+    наполовину). На терне следующая карта - ривер, на ривере потенциал равен 0."""
+
+    board: tuple[int, ...]
+    valid: np.ndarray
+    hs: np.ndarray
+    ehs: np.ndarray
+    ehs2: np.ndarray
+    ppot: np.ndarray
+    npot: np.ndarray
+    histogram: np.ndarray
+
+    def index(self, hand: Collection[Card]) -> int:
+        """Номер руки в COMBOS"""
+        a, b = map(Card.to_int, hand)
+        return int(_COMBO_INDEX[a, b])
+
+
+def _combo_ranks(boards: np.ndarray) -> np.ndarray:
+    """Ранги всех рук COMBOS на каждом столе boards (R, n): (R, 1326), -1 для рук,
+    пересекающихся со столом. Это не ранги evaluator, а их сжатые номера (меньше
+    2^16): они сравнимы между собой только в пределах одного вызова.
+    С таблицей работа по столу делается один раз: номер набора стол + рука в таблице
+    равен base + X[младшая карта] + Y[старшая карта] с таблицами X, Y на 52 карты."""
+    r, n = boards.shape
+    conflict = np.zeros((r, 52), dtype=bool)
+    np.put_along_axis(conflict, boards, True, axis=1)
+    valid = ~(conflict[:, COMBOS[:, 0]] | conflict[:, COMBOS[:, 1]])
+
+    table = get_table(n + 2)
+    if table is None:
+        ranks = np.full((r, len(COMBOS)), -1, dtype=np.int64)
+        rows, combos = np.nonzero(valid)
+        ranks[rows, combos] = np.unique(
+            lookup_batch(np.hstack((boards[rows], COMBOS[combos]))),
+            return_inverse=True,
+        )[1]
+        return ranks
+
+    # места карт стола в отсортированном наборе сдвигаются на число карт руки ниже
+    board = np.sort(boards, axis=1)
+    positions = np.arange(n)
+    terms = [BINOMIAL[board, positions + 1 + shift] for shift in range(3)]
+    base = terms[0].sum(axis=1)
+    cards = np.arange(52)
+    above = board[:, None, :] > cards[None, :, None]  # (R, 52, n): x_i > c
+    below = n - above.sum(axis=2)  # карт стола ниже c
+    x = BINOMIAL[cards, below + 1] + (above * (terms[1] - terms[0])[:, None]).sum(2)
+    y = BINOMIAL[cards, below + 2] + (above * (terms[2] - terms[1])[:, None]).sum(2)
+    index = base[:, None] + x[:, COMBOS[:, 1]] + y[:, COMBOS[:, 0]]
+    ranks = table.table[np.where(valid, index, 0)].astype(np.int64)
+    return np.where(valid, ranks, -1)
+
+
+def _less_equal(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Для каждого элемента - число неотрицательных элементов той же строки
+    (по последней оси), меньших его и равных ему (включая его самого).
+    Значения - сжатые ранги или -1: в uint16 устойчивая сортировка поразрядная."""
+    shape, m = values.shape, values.shape[-1]
+    rows = (values + 1).astype(np.uint16).reshape(-1, m)
+    order = np.argsort(rows, axis=-1, kind="stable")
+    order += (np.arange(len(rows)) * m)[:, None]
+    flat = order.ravel()
+    ordered = rows.ravel()[flat].reshape(rows.shape)
+
+    # в упорядоченной строке равные значения идут подряд: для каждого места -
+    # начало и конец его отрезка
+    positions = np.arange(m, dtype=np.int16)
+    newRun = np.ones(rows.shape, dtype=bool)
+    newRun[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    starts = np.maximum.accumulate(np.where(newRun, positions, 0), axis=-1)
+    runEnd = np.ones(rows.shape, dtype=bool)
+    runEnd[:, :-1] = newRun[:, 1:]
+    ends = np.minimum.accumulate(np.where(runEnd, positions + 1, m)[:, ::-1], axis=-1)[
+        :, ::-1
+    ]
+
+    less = np.empty(rows.size, dtype=np.int16)
+    equal = np.empty(rows.size, dtype=np.int16)
+    less[flat] = (starts - (rows == 0).sum(-1, keepdims=True, dtype=np.int16)).ravel()
+    equal[flat] = (ends - starts).ravel()
+    return less.reshape(shape), equal.reshape(shape)
+
+
+def _by_combo(grouped: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Значения (..., 52, 51) по группам карт -> значения для двух групп каждой руки"""
+    return (
+        grouped[..., COMBOS[:, 0], COMBOS[:, 1]],
+        grouped[..., COMBOS[:, 1], COMBOS[:, 0] - 1],
+    )
+
+
+def _strength(ranks: np.ndarray, n_board: int) -> np.ndarray:
+    """Сила каждой руки на каждом столе по рангам _combo_ranks (nan - рука
+    пересекается со столом): соперник - любая рука без карт стола и руки"""
+    less, equal = _less_equal(ranks)
+    groupLess, groupEqual = _less_equal(ranks[:, _GROUPS])
+    (lessA, lessB), (equalA, equalB) = _by_combo(groupLess), _by_combo(groupEqual)
+    # соперники с общей картой исключаются; сама рука равна себе во всех трех счетах
+    wins = less - lessA - lessB
+    ties = equal - equalA - equalB + 1
+    opponents = comb(52 - n_board - 2, 2)
+    return np.where(ranks >= 0, (wins + ties / 2) / opponents, np.nan)
+
+
+def _potential_counts(
+    current: np.ndarray, nexts: np.ndarray, n_next: int
+) -> np.ndarray:
+    """По рангам на текущем столе (1326,) и на столах со следующей картой
+    (R, 1326), в которых n_next карт: для каждой руки - суммы по следующим картам
+    числа соперников в каждом сочетании "сейчас" x "потом" (0 - рука впереди,
+    1 - ничья, 2 - позади). Соперники считаются через двумерные префиксные суммы
+    по сжатым рангам, а соперники с общей с рукой картой вычитаются попарным
+    сравнением внутри групп рук одной карты."""
+    valid = current >= 0
+    ok = valid & (nexts >= 0)
+    cd = np.full(len(COMBOS), -1)
+    cd[valid] = np.unique(current[valid], return_inverse=True)[1]
+    kc = cd.max() + 1
+    c = np.maximum(cd, 0)
+
+    # l - ранг соперника меньше, L - не больше, . - любой: "ll" - соперник позади
+    # и сейчас, и потом; "l." - позади сейчас
+    names = ("ll", "lL", "Ll", "LL", "l.", "L.", ".l", ".L")
+    totals = {name: np.zeros(nexts.shape, dtype=np.int64) for name in names}
+    rd = np.full(nexts.shape, -1)
+    for i, nextRanks in enumerate(nexts):
+        rd[i, ok[i]] = np.unique(nextRanks[ok[i]], return_inverse=True)[1]
+        kr = rd[i].max() + 1
+        r = np.maximum(rd[i], 0)
+        # prefix[i, j] - число рук с cd < i и rd < j
+        hist = np.bincount(cd[ok[i]] * kr + r[ok[i]], minlength=kc * kr)
+        prefix = np.zeros((kc + 1, kr + 1), dtype=np.int64)
+        prefix[1:, 1:] = hist.reshape(kc, kr).cumsum(0).cumsum(1)
+        for name, row, column in (
+            ("ll", c, r),
+            ("lL", c, r + 1),
+            ("Ll", c + 1, r),
+            ("LL", c + 1, r + 1),
+            ("l.", c, kr),
+            ("L.", c + 1, kr),
+            (".l", kc, r),
+            (".L", kc, r + 1),
+        ):
+            totals[name][i] = prefix[row, column]
+
+    # соперники с общей картой - попарно внутри групп: [стол, группа, рука, соперник]
+    gc, gr = cd[_GROUPS].astype(np.int16), rd[:, _GROUPS].astype(np.int16)
+    gok = ok[:, _GROUPS][:, :, None, :]
+    now = {"l": gc[:, None, :] < gc[:, :, None], "L": gc[:, None, :] <= gc[:, :, None]}
+    later = {
+        "l": (gr[..., None, :] < gr[..., None]) & gok,
+        "L": (gr[..., None, :] <= gr[..., None]) & gok,
+        ".": gok,
+    }
+    n = {}
+    for name in names:
+        pairs = later[name[1]] if name[0] == "." else now[name[0]] & later[name[1]]
+        a, b = _by_combo(np.count_nonzero(pairs, axis=-1))
+        # сама рука входит во все счета без "l" по обеим своим картам
+        n[name] = totals[name] - a - b + ("l" not in name)
+
+    table = np.zeros((*nexts.shape, 3, 3))
+    table[..., 0, 0] = n["ll"]
+    table[..., 0, 1] = n["lL"] - n["ll"]
+    table[..., 0, 2] = n["l."] - n["lL"]
+    table[..., 1, 0] = n["Ll"] - n["ll"]
+    table[..., 1, 1] = n["LL"] - n["lL"] - n["Ll"] + n["ll"]
+    table[..., 1, 2] = n["L."] - n["l."] - n["LL"] + n["lL"]
+    table[..., 2, 0] = n[".l"] - n["Ll"]
+    table[..., 2, 1] = n[".L"] - n[".l"] - n["LL"] + n["Ll"]
+    table[..., 2, 2] = comb(52 - n_next - 2, 2) - n["L."] - n[".L"] + n["LL"]
+    return (table * ok[..., None, None]).sum(axis=0)
+
+
+def _runouts(board: tuple[int, ...], k: int) -> np.ndarray:
+    """Все столы из карт board и еще k карт из оставшихся: (R, len(board) + k)"""
+    rest = sorted(set(range(52)) - set(board))
+    added = np.array(list(combinations(rest, k)), dtype=np.int64).reshape(
+        comb(len(rest), k), k
+    )
+    return np.hstack(
+        (
+            np.broadcast_to(np.array(board, dtype=np.int64), (len(added), len(board))),
+            added,
+        )
+    )
+
+
+@lru_cache(maxsize=64)
+def _board_strength(board: tuple[int, ...], bins: int) -> BoardStrength:
+    n_board = len(board)
+    current = _combo_ranks(np.array([board], dtype=np.int64))
+    valid = current[0] >= 0
+    hs = _strength(current, n_board)[0]
+
+    riverRanks = _combo_ranks(_runouts(board, 5 - n_board))
+    river = _strength(riverRanks, 5)
+    seen = ~np.isnan(river)
+    runs = np.maximum(seen.sum(axis=0), 1)
+    ehs = np.where(seen, river, 0).sum(axis=0) / runs
+    ehs2 = np.where(seen, river * river, 0).sum(axis=0) / runs
+    cell = np.minimum((np.where(seen, river, 0) * bins).astype(int), bins - 1)
+    cell += np.arange(len(COMBOS)) * bins
+    histogram = (
+        np.bincount(cell[seen], minlength=len(COMBOS) * bins).reshape(len(COMBOS), bins)
+        / runs[:, None]
+    )
+
+    ppot = np.zeros(len(COMBOS))
+    npot = np.zeros(len(COMBOS))
+    if n_board < 5:
+        # на терне следующая карта - ривер, ранги уже посчитаны
+        nexts = riverRanks if n_board == 4 else _combo_ranks(_runouts(board, 1))
+        counts = _potential_counts(current[0], nexts, n_board + 1)
+        totals = counts.sum(axis=2)
+        # обход соперника, который впереди (ничья - наполовину), и наоборот
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ppot = (counts[:, 2, 0] + counts[:, 2, 1] / 2 + counts[:, 1, 0] / 2) / (
+                totals[:, 2] + totals[:, 1] / 2
+            )
+            npot = (counts[:, 0, 2] + counts[:, 0, 1] / 2 + counts[:, 1, 2] / 2) / (
+                totals[:, 0] + totals[:, 1] / 2
+            )
+        ppot = np.nan_to_num(ppot)
+        npot = np.nan_to_num(npot)
+
+    nan = np.where(valid, 0, np.nan)
+    strength = BoardStrength(
+        board=board,
+        valid=valid,
+        hs=hs,
+        ehs=ehs + nan,
+        ehs2=ehs2 + nan,
+        ppot=ppot + nan,
+        npot=npot + nan,
+        histogram=histogram + nan[:, None],
+    )
+    # результат хранится в кэше и общий для всех вызывающих
+    for name in ("valid", "hs", "ehs", "ehs2", "ppot", "npot", "histogram"):
+        getattr(strength, name).setflags(write=False)
+    return strength
+
+
+def board_strength(board: Collection[Card], bins=50) -> BoardStrength:
+    """Показатели силы всех 1326 рук на столе из 3-5 карт. Результаты для последних
+    столов кэшируются: порядок карт стола не важен.
+    Скорость зависит от таблиц rank_table для 5-7 карт (python rank_table.py -k N):
+    с ними флоп считается примерно за полсекунды, терн - за десятую, без них
+    ранги считает evaluate_batch, и флоп занимает около двух секунд."""
+    if not 3 <= len(board) <= 5:
+        raise ValueError("board must have 3 to 5 cards")
+    if len(CardMask(board)) != len(board):
+        raise ValueError("Board contains duplicate cards")
+    return _board_strength(tuple(sorted(map(Card.to_int, board))), bins)
+
+
+def kmeans(
+    points: np.ndarray, k: int, iterations=100, seed: Optional[int] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """k-средних: центры (k, d) и номер центра для каждой точки (N, d).
+    Начальные центры выбираются как в k-means++."""
+    if not 1 <= k <= len(points):
+        raise ValueError(f"k must be between 1 and the number of points, got {k}")
+    rng = np.random.default_rng(seed)
+    centers = points[[rng.integers(len(points))]].astype(float)
+    distances = ((points - centers[0]) ** 2).sum(axis=1)
+    while len(centers) < k:
+        total = distances.sum()
+        chosen = rng.choice(len(points), p=distances / total) if total else 0
+        centers = np.vstack((centers, points[chosen]))
+        distances = np.minimum(distances, ((points - points[chosen]) ** 2).sum(axis=1))
+
+    labels = np.full(len(points), -1)
+    for _ in range(iterations):
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, |p|^2 одинаково для всех центров
+        newLabels = ((centers**2).sum(axis=1) - 2 * points @ centers.T).argmin(axis=1)
+        if (newLabels == labels).all():
+            break
+        labels = newLabels
+        for i in range(k):
+            members = points[labels == i]
+            if len(members):
+                centers[i] = members.mean(axis=0)
+    return centers, labels
+
+
+def bucket(strength: BoardStrength, k: int, seed: Optional[int] = None) -> np.ndarray:
+    """Разбиение рук на k групп k-средними по гистограммам силы на ривере:
+    сравниваются накопленные гистограммы, для которых евклидово расстояние близко
+    к расстоянию перемещения (EMD) между распределениями. Номер группы для каждой
+    руки COMBOS, -1 - рука пересекается со столом."""
+    points = np.cumsum(strength.histogram[strength.valid], axis=1)
+    labels = np.full(len(COMBOS), -1)
+    labels[strength.valid] = kmeans(points, k, seed=seed)[1]
+    return labels
+
+
+__all__ = ["COMBOS", "BoardStrength", "board_strength", "bucket", "kmeans"]
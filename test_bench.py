@@ -0,0 +1,32 @@
+from unittest import TestCase
+
+from bench import BENCHMARKS, compare, run, sampler_efficiency
+
+
+class BenchTest(TestCase):
+    def test_run(self):
+        results = run(["card.parse", "find_highest.5"], repeat=1, scale=0.01)
+        self.assertSetEqual(set(results), {"card.parse", "find_highest.5"})
+        for result in results.values():
+            self.assertGreater(result["ops_per_sec"], 0)
+
+    def test_registry(self):
+        self.assertIn("compare.7", BENCHMARKS)
+        self.assertIn("equity.board3.players6", BENCHMARKS)
+
+    def test_compare(self):
+        baseline = {"a": {"us_per_op": 1.0}, "b": {"us_per_op": 1.0}}
+        results = {
+            "a": {"us_per_op": 1.05},
+            "b": {"us_per_op": 1.5},
+            "c": {"us_per_op": 9.0},
+        }
+        self.assertDictEqual(compare(results, baseline, threshold=0.1), {"b": 1.5})
+
+    def test_sampler_efficiency(self):
+        results = sampler_efficiency(["turn.players2"], runs=3, trials=200)
+        self.assertIn("quasi.turn.players2", results)
+        self.assertIn("difference.common.turn.players2", results)
+        self.assertEqual(results["random.turn.players2"]["gain"], 1)
+        for result in results.values():
+            self.assertGreater(result["cpu_seconds"], 0)
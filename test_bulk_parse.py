@@ -0,0 +1,66 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from bulk_parse import parse_cards, parse_file
+from card import Card, CardSet
+
+
+def ids(setstr: str, factory=Card.parse) -> list[int]:
+    return [factory(s).to_int() for s in setstr.split()]
+
+
+class ParseCardsTest(TestCase):
+    def test_english(self):
+        result = parse_cards("AS KD 2C\n7H  TD\t9S\r\n")
+        self.assertEqual(result.cards.dtype, np.uint8)
+        self.assertListEqual(result.cards.tolist(), [ids("AS KD 2C"), ids("7H TD 9S")])
+        self.assertListEqual(result.lines.tolist(), [1, 2])
+
+    def test_russian(self):
+        result = parse_cards("ТП КБ 2Т\nЕЧ ВП 9Б\n".encode(), rus=True)
+        self.assertListEqual(
+            result.cards.tolist(),
+            [ids("ТП КБ 2Т", Card.parse_rus), ids("ЕЧ ВП 9Б", Card.parse_rus)],
+        )
+
+    def test_matches_cardset_parse(self):
+        sets = [CardSet.random(7) for _ in range(200)]
+        result = parse_cards("\n".join(map(str, sets)))
+        self.assertListEqual(
+            result.cards.tolist(), [[c.to_int() for c in s] for s in sets]
+        )
+
+    def test_errors(self):
+        text = "AS KD\n\nAS ZZ\nAS AS\nAS KD QD\n2C 3C\nASKD 4C\n"
+        self.assertRaisesRegex(ValueError, "line 3", parse_cards, text)
+
+        result = parse_cards(text, strict=False)
+        self.assertListEqual(result.cards.tolist(), [ids("AS KD"), ids("2C 3C")])
+        self.assertListEqual(result.lines.tolist(), [1, 6])
+        self.assertListEqual(
+            result.errors,
+            [
+                (3, "bad card 'ZZ'"),
+                (4, "duplicate card AS"),
+                (5, "expected 2 cards, got 3"),
+                (7, "bad card 'ASKD'"),
+            ],
+        )
+
+    def test_empty(self):
+        self.assertEqual(parse_cards("").cards.shape, (0, 0))
+        self.assertEqual(parse_cards("\n\n", k=5).cards.shape, (0, 5))
+
+
+class ParseFileTest(TestCase):
+    def test_file(self):
+        with TemporaryDirectory() as dir:
+            path = os.path.join(dir, "hands.txt")
+            with open(path, "w") as f:
+                f.write("AS KD\n2C 3C\nAS ZZ\n")
+            self.assertRaisesRegex(ValueError, "line 3", parse_file, path)
+            result = parse_file(path, strict=False)
+            self.assertEqual(len(result.cards), 2)
@@ -1,5 +1,6 @@
 from unittest import TestCase
-from card import Card, Suit, CardSet
+import pickle
+from card import Card, Suit, CardSet, CardMask
 
 
 class CardTest(TestCase):
@@ -46,6 +47,26 @@ class CardTest(TestCase):
             c = Card.random()
             self.assertEqual(c, Card.from_int(c.to_int()))
 
+    def test_interned(self):
+        self.assertIs(Card.parse("QS"), Card(Suit.S, 12))
+        self.assertIs(Card.from_int(Card.parse("QS").to_int()), Card.parse("QS"))
+        self.assertIs(pickle.loads(pickle.dumps(Card.parse("QS"))), Card.parse("QS"))
+
+    def test_immutable(self):
+        card = Card.parse("QS")
+        with self.assertRaises(AttributeError):
+            card.value = 13
+
+    def test_str(self):
+        for i in range(52):
+            card = Card.from_int(i)
+            self.assertEqual(Card.parse(str(card)), card)
+
+    def test_bad(self):
+        self.assertRaises(ValueError, Card.parse, "1S")
+        self.assertRaises(ValueError, Card.parse, "AX")
+        self.assertRaises(ValueError, Card, Suit.S, 15)
+
 
 class CardSetTest(TestCase):
     def test_1(self):
@@ -68,3 +89,42 @@ class CardSetTest(TestCase):
         cards = tuple(map(lambda s: Card.parse(s), "KS JD JS 5C 2H".split(" ")))
 
         self.assertSequenceEqual(set.cards, cards)
+
+    def test_random_distinct(self):
+        for _ in range(20):
+            self.assertEqual(len(set(CardSet.random(20))), 20)
+
+    def test_random_excluding(self):
+        excluded = CardSet.parse("AS KS QS")
+        for card in CardSet.random(49, excluding=excluded):
+            self.assertNotIn(card, excluded)
+
+
+class CardMaskTest(TestCase):
+    def test_set_algebra(self):
+        a = CardSet.parse("AS KS 2H").mask
+        b = CardSet.parse("KS 2C").mask
+        self.assertEqual(a | b, CardSet.parse("AS KS 2H 2C").mask)
+        self.assertEqual(a & b, CardSet.parse("KS").mask)
+        self.assertEqual(a - b, CardSet.parse("AS 2H").mask)
+        self.assertEqual(len(a | b), 4)
+        self.assertIn(Card.parse("2H"), a)
+        self.assertNotIn(Card.parse("2C"), a)
+
+    def test_masks(self):
+        mask = CardSet.parse("AS KS 2H 2C").mask
+        self.assertEqual(mask.rank_mask, 1 << 12 | 1 << 11 | 1)
+        self.assertEqual(mask.suit_mask(Suit.S), 1 << 12 | 1 << 11)
+        self.assertEqual(mask.suit_mask(Suit.D), 0)
+
+    def test_iterates(self):
+        cards = CardSet.parse("AS KS 2H 2C")
+        self.assertCountEqual(list(cards.mask), cards.cards)
+        self.assertEqual(cards.mask.ids(), sorted(map(Card.to_int, cards)))
+        self.assertEqual(len(CardMask.deck()), 52)
+
+    def test_deal(self):
+        deck = CardMask.deck() - CardSet.parse("AS KS").mask
+        dealt = deck.deal(50)
+        self.assertEqual(len(set(dealt)), 50)
+        self.assertNotIn(Card.parse("AS"), dealt)
@@ -1,7 +1,9 @@
+from random import Random
 from unittest import TestCase
 
-from card import CardSet, Suit
+from card import Card, CardSet, Suit
 from combinations import (
+    Combination,
     Flush,
     FullHouse,
     Straight,
@@ -14,6 +16,7 @@ from combinations import (
     HighCard,
     CombinationException,
 )
+from evaluator import evaluate
 
 
 class CompareTest(TestCase):
@@ -225,3 +228,42 @@ class StraightFlushTest(TestCase):
         sf1 = StraightFlush(CardSet.parse("KD 4C 6C 2C 3C 4H 5C"))
         sf2 = StraightFlush(CardSet.parse("9H AS QS TS 3H KS JS"))
         self.assertEqual(sf1.compare(sf2), CompareResult.LESS)
+
+
+class FindHighestTest(TestCase):
+    def test_agrees_with_trial(self):
+        rnd = Random(13)
+        for size in range(5, 10):
+            for _ in range(300):
+                set = CardSet(map(Card.from_int, rnd.sample(range(52), size)))
+                comb = Combination.find_highest(set)
+                expected = Combination.find_highest_by_trial(set)
+                self.assertIs(type(comb), type(expected), str(set))
+                self.assertEqual(comb.name, expected.name)
+                self.assertEqual(vars(comb), vars(expected), str(set))
+                self.assertEqual(comb.compare(expected), CompareResult.EQUAL)
+
+    def test_key_matches_evaluate(self):
+        rnd = Random(14)
+        for _ in range(300):
+            set = CardSet(map(Card.from_int, rnd.sample(range(52), 7)))
+            self.assertEqual(Combination.find_highest(set).key, evaluate(set))
+
+
+class OrderingTest(TestCase):
+    def test_sort_and_max(self):
+        hands = [
+            Combination.find_highest(CardSet.parse(s))
+            for s in ("9H AS QS TS 3H KS JS", "AD 5D AS 2H 4C", "2C 6H AD 9S JD")
+        ]
+        self.assertListEqual(
+            [c.name for c in sorted(hands)], ["High Card", "Pair", "Flush Royale"]
+        )
+        self.assertEqual(max(hands).name, "Flush Royale")
+
+    def test_equal_and_hash(self):
+        pair1 = Pair(CardSet.parse("AD 5D AS 2H 4C"))
+        pair2 = Pair(CardSet.parse("AH 5C AC 2D 4S"))
+        self.assertEqual(pair1, pair2)
+        self.assertEqual(len({pair1, pair2}), 1)
+        self.assertLess(pair1, Pair(CardSet.parse("AH 6C AC 2D 4S")))
@@ -0,0 +1,76 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+import os
+
+from card import CardSet, canonicalize
+from equity_cache import EquityCache
+
+
+class CanonicalizeTest(TestCase):
+    def test_suit_relabeling(self):
+        self.assertEqual(
+            canonicalize(CardSet.parse("AH KH"), CardSet.parse("2H 7C 9D")),
+            canonicalize(CardSet.parse("AS KS"), CardSet.parse("2S 7D 9C")),
+        )
+
+    def test_order_independent(self):
+        self.assertEqual(
+            canonicalize(CardSet.parse("AH KH"), CardSet.parse("2H 7C 9D")),
+            canonicalize(CardSet.parse("KH AH"), CardSet.parse("9D 2H 7C")),
+        )
+
+    def test_distinct(self):
+        self.assertNotEqual(
+            canonicalize(CardSet.parse("AH KH"), CardSet.parse("2H 7C 9D")),
+            canonicalize(CardSet.parse("AH KD"), CardSet.parse("2H 7C 9D")),
+        )
+
+
+class EquityCacheTest(TestCase):
+    hand = CardSet.parse("AH KH").cards
+    table = CardSet.parse("2H 7C 9D").cards
+
+    def test_hits(self):
+        cache = EquityCache()
+        first = cache.equity(self.hand, self.table, 3, n=1000)
+        second = cache.equity(
+            CardSet.parse("AS KS").cards, CardSet.parse("2S 7D 9C").cards, 3, n=1000
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        cache.equity(self.hand, self.table, 3, n=2000)
+        self.assertEqual(cache.stats()["misses"], 2, "Precision is part of the key")
+
+    def test_options(self):
+        cache = EquityCache()
+        sampled = cache.equity(self.hand, self.table, 2, n=1000, exact=False, seed=1)
+        exact = cache.equity(self.hand, self.table, 2, n=1000, exact=True)
+        self.assertEqual(cache.stats()["misses"], 2, "Options are part of the key")
+        self.assertNotEqual(sampled, exact)
+        self.assertEqual(
+            cache.equity(self.hand, self.table, 2, n=1000, seed=1, exact=False),
+            sampled,
+        )
+        cache.equity(self.hand, self.table, 2, n=1000, exact=True, workers=2)
+        self.assertEqual(cache.stats()["hits"], 2, "workers does not change results")
+
+    def test_lru(self):
+        cache = EquityCache(maxsize=2)
+        for players in (2, 3, 4):
+            cache.equity(self.hand, self.table, players, n=100, exact=False)
+        self.assertEqual(len(cache), 2)
+        cache.equity(self.hand, self.table, 2, n=100, exact=False)
+        self.assertEqual(cache.stats()["misses"], 4, "Oldest entry was evicted")
+
+    def test_persistence(self):
+        with TemporaryDirectory() as dir:
+            path = os.path.join(dir, "cache.pickle")
+            cache = EquityCache(path=path)
+            value = cache.equity(self.hand, self.table, 3, n=1000)
+            cache.save()
+
+            restored = EquityCache(path=path)
+            self.assertEqual(restored.equity(self.hand, self.table, 3, n=1000), value)
+            self.assertEqual(restored.stats()["hits"], 1)
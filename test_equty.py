@@ -0,0 +1,209 @@
+from unittest import TestCase
+
+import numpy as np
+
+from card import CardSet
+from equty import (
+    BATCH_SIZE,
+    common_equity,
+    compute_equity,
+    count_deals,
+    enumerate_equity,
+    equity_stats,
+    estimate_equity,
+)
+
+
+class ComputeEquityTest(TestCase):
+    def test_pocket_aces(self):
+        equity = compute_equity(CardSet.parse("AS AD").cards, (), 2, n=20000, seed=0)
+        self.assertAlmostEqual(equity, 0.85, delta=0.01)
+
+    def test_batched_matches_loop(self):
+        hand = CardSet.parse("AS KS").cards
+        table = CardSet.parse("QS JS 2D").cards
+        self.assertAlmostEqual(
+            compute_equity(hand, table, 3, n=20000, seed=1),
+            compute_equity(hand, table, 3, n=20000, batched=False, seed=1),
+            delta=0.02,
+        )
+
+    def test_river(self):
+        hand = CardSet.parse("AS AD").cards
+        table = CardSet.parse("AH AC 2D 7S 9C").cards
+        self.assertEqual(compute_equity(hand, table, 4, n=1000), 1.0)
+
+    def test_no_opponents(self):
+        hand = CardSet.parse("7C 2D").cards
+        for table in ((), CardSet.parse("QS JS 2S").cards):
+            for options in (
+                dict(exact=True),
+                dict(exact=False),
+                dict(exact=False, batched=False),
+                {},
+            ):
+                self.assertEqual(compute_equity(hand, table, 1, n=1000, **options), 1.0)
+
+
+class ReproducibilityTest(TestCase):
+    hand = CardSet.parse("9H 8H").cards
+    table = CardSet.parse("7H 2C KH").cards
+
+    def test_same_seed(self):
+        self.assertEqual(
+            compute_equity(self.hand, self.table, 3, n=3000, seed=42),
+            compute_equity(self.hand, self.table, 3, n=3000, seed=42),
+        )
+
+    def test_independent_of_workers(self):
+        n = 3 * BATCH_SIZE + 17
+        self.assertEqual(
+            compute_equity(self.hand, self.table, 3, n=n, seed=7),
+            compute_equity(self.hand, self.table, 3, n=n, seed=7, workers=2),
+        )
+
+
+class EnumerateEquityTest(TestCase):
+    def test_count_deals(self):
+        self.assertEqual(count_deals(4, 2), 46 * 990)
+        self.assertEqual(count_deals(5, 3), 990 * 903)
+
+    def test_fractions(self):
+        result = enumerate_equity(
+            CardSet.parse("AS KD").cards, CardSet.parse("QS JS 2D 3C").cards, 2
+        )
+        self.assertAlmostEqual(result.win + result.tie + result.loss, 1)
+        self.assertAlmostEqual(
+            result.equity,
+            compute_equity(
+                CardSet.parse("AS KD").cards,
+                CardSet.parse("QS JS 2D 3C").cards,
+                2,
+                n=50000,
+                exact=False,
+                seed=3,
+            ),
+            delta=0.01,
+        )
+
+    def test_board_plays(self):
+        result = enumerate_equity(
+            CardSet.parse("2C 3D").cards, CardSet.parse("AS KS QS JS TS").cards, 2
+        )
+        self.assertEqual((result.win, result.tie, result.loss), (0, 1, 0))
+        self.assertEqual(result.equity, 0.5)
+
+    def test_auto_switch(self):
+        hand = CardSet.parse("AS KD").cards
+        table = CardSet.parse("QS JS 2D 3C").cards
+        self.assertEqual(
+            compute_equity(hand, table, 2), enumerate_equity(hand, table, 2).equity
+        )
+
+
+class EstimateEquityTest(TestCase):
+    def test_interval(self):
+        est = estimate_equity(CardSet.parse("AS AD").cards, (), 2, stderr=0.005, seed=0)
+        self.assertLessEqual(est.low, est.estimate)
+        self.assertLessEqual(est.estimate, est.high)
+        self.assertLess(est.low, 0.852)
+        self.assertGreater(est.high, 0.852)
+        self.assertLessEqual((est.high - est.low) / 2, 1.96 * 0.005 + 1e-9)
+
+    def test_stops_early_on_lock(self):
+        est = estimate_equity(
+            CardSet.parse("AS AD").cards,
+            CardSet.parse("AH AC 2D 7S 9C").cards,
+            4,
+            half_width=0.01,
+            block=500,
+        )
+        self.assertEqual(est.estimate, 1)
+        self.assertEqual(est.trials, 500)
+
+    def test_max_trials(self):
+        est = estimate_equity(
+            CardSet.parse("7C 2D").cards, (), 2, half_width=0.0001, max_trials=1200
+        )
+        self.assertEqual(est.trials, 1200)
+
+    def test_target_required(self):
+        self.assertRaises(
+            ValueError, estimate_equity, CardSet.parse("7C 2D").cards, (), 2
+        )
+
+    def test_bad_parameters(self):
+        hand = CardSet.parse("7C 2D").cards
+        for options in (
+            dict(half_width=0.01, max_trials=0),
+            dict(half_width=0.01, block=0),
+            dict(half_width=0.0),
+            dict(stderr=-0.01),
+            dict(stderr=0.01, confidence=1.0),
+        ):
+            with self.assertRaises(ValueError, msg=str(options)):
+                estimate_equity(hand, (), 2, **options)
+
+
+class DeadCardsTest(TestCase):
+    def test_duplicates(self):
+        self.assertRaises(
+            ValueError,
+            compute_equity,
+            CardSet.parse("AS KS").cards,
+            CardSet.parse("AS 2D 3C").cards,
+            2,
+        )
+
+
+class EquityStatsTest(TestCase):
+    def test_split_pot_counts_as_share(self):
+        # на столе стрит-флеш: все игроки делят банк
+        hand = CardSet.parse("2C 3D").cards
+        table = CardSet.parse("AS KS QS JS TS").cards
+        stats = equity_stats(hand, table, 3, n=2000, exact=False, seed=0)
+        self.assertEqual((stats.win, stats.tie, stats.loss), (0, 1, 0))
+        self.assertAlmostEqual(stats.equity, 1 / 3)
+        self.assertAlmostEqual(compute_equity(hand, table, 3, exact=True), 1 / 3)
+
+    def test_loop_matches_batched(self):
+        hand = CardSet.parse("2C 3D").cards
+        table = CardSet.parse("AS KS QS JS TS").cards
+        stats = equity_stats(hand, table, 4, n=500, batched=False, exact=False)
+        self.assertAlmostEqual(stats.equity, 1 / 4)
+
+    def test_equity_between_win_and_win_plus_tie(self):
+        stats = equity_stats(
+            CardSet.parse("AS KD").cards, CardSet.parse("QS JS 2D").cards, 3, n=5000
+        )
+        self.assertLessEqual(stats.win, stats.equity)
+        self.assertLessEqual(stats.equity, stats.win + stats.tie)
+        self.assertAlmostEqual(stats.win + stats.tie + stats.loss, 1)
+
+
+class CommonEquityTest(TestCase):
+    table = CardSet.parse("QS JS 2D").cards
+    hands = (CardSet.parse("AS KS").cards, CardSet.parse("AS KD").cards)
+
+    def test_matches_enumeration(self):
+        table = CardSet.parse("QS JS 2D 5C").cards
+        result = common_equity(self.hands, table, 2, n=20000, seed=0)
+        for i, hand in enumerate(self.hands):
+            self.assertAlmostEqual(
+                result.equity[i], enumerate_equity(hand, table, 2).equity, delta=0.015
+            )
+
+    def test_difference_has_lower_variance(self):
+        result = common_equity(self.hands, self.table, 2, n=20000, seed=1)
+        difference, stderr = result.difference(0, 1)
+        self.assertGreater(difference, 0)
+        self.assertLess(stderr, np.hypot(*result.stderr()) * 0.75)
+
+    def test_antithetic_and_players_per_hand(self):
+        result = common_equity(
+            self.hands, self.table, [2, 3], n=3001, seed=2, antithetic=True
+        )
+        self.assertEqual(result.trials, 3002)
+        self.assertEqual(result.covariance.shape, (2, 2))
+        self.assertGreater(result.equity[0], result.equity[1])
+        self.assertRaises(ValueError, common_equity, self.hands, self.table, [2])
@@ -0,0 +1,107 @@
+from unittest import TestCase
+from random import Random
+
+import numpy as np
+
+from card import Card, CardSet
+from combinations import Combination, CompareResult, compare_ints
+from evaluator import BoardState, category, evaluate, evaluate_batch, evaluate_ints
+
+
+def random_set(rnd: Random, n: int) -> CardSet:
+    return CardSet(map(Card.from_int, rnd.sample(range(52), n)))
+
+
+class EvaluateTest(TestCase):
+    def test_categories(self):
+        for setstr, name in (
+            ("2C 6H AD 9S JD", "High Card"),
+            ("AD 5D AS 2H 4C", "Pair"),
+            ("KS 6S 7D 2D 2C QH 7C", "Two Pairs"),
+            ("8C 5H 9S 3H 5S 7H 6D", "Straight"),
+            ("7S 4S 2H 5H AS QC 3C", "Straight"),
+            ("QH 7S TH 7H KC 4H 3H", "Flush"),
+            ("TC 8S 8D 7H 8H TS TH", "Full House"),
+            ("KD 4C 6C 2C 3C 4H 5C", "Straight Flush"),
+        ):
+            self.assertEqual(
+                category(evaluate(CardSet.parse(setstr))),
+                Combination.list[name].value,
+                setstr,
+            )
+
+    def test_straight_with_pair_inside(self):
+        set = CardSet.parse("9C 8H 8S 7D 6C 5H 2D")
+        self.assertEqual(category(evaluate(set)), 5)
+        self.assertEqual(Combination.find_highest(set).name, "Straight")
+
+    def test_six_card_flush(self):
+        set = CardSet.parse("QH 9H TH 7H KC 4H 3H")
+        self.assertEqual(category(evaluate(set)), 6)
+        self.assertEqual(Combination.find_highest(set).name, "Flush")
+
+    def test_order_independent(self):
+        ids = [51, 3, 17, 22, 40, 8, 30]
+        self.assertEqual(evaluate_ints(ids), evaluate_ints(reversed(ids)))
+
+    def test_agrees_with_compare(self):
+        rnd = Random(1)
+        for n in (5, 6, 7):
+            for _ in range(300):
+                set1, set2 = random_set(rnd, n), random_set(rnd, n)
+                expected = Combination.find_highest_by_trial(set1).compare(
+                    Combination.find_highest_by_trial(set2)
+                )
+                self.assertEqual(
+                    compare_ints(evaluate(set1), evaluate(set2)),
+                    expected,
+                    f"Failed for sets: ({set1}) and ({set2})",
+                )
+
+    def test_find_highest(self):
+        rnd = Random(2)
+        for _ in range(300):
+            set = random_set(rnd, 7)
+            self.assertEqual(
+                Combination.find_highest(set).compare(
+                    Combination.find_highest_by_trial(set)
+                ),
+                CompareResult.EQUAL,
+            )
+
+
+class EvaluateBatchTest(TestCase):
+    def test_agrees_with_evaluate_ints(self):
+        rng = np.random.default_rng(5)
+        for k in (5, 6, 7):
+            hands = np.argsort(rng.random((3000, 52)), axis=1)[:, :k]
+            self.assertListEqual(
+                evaluate_batch(hands).tolist(),
+                [evaluate_ints(hand) for hand in hands.tolist()],
+            )
+
+    def test_shape(self):
+        hands = np.array([[48, 49, 50, 51, 0], [0, 4, 8, 12, 17]])
+        self.assertEqual(evaluate_batch(hands).shape, (2,))
+        self.assertListEqual(list(map(category, evaluate_batch(hands))), [8, 5])
+
+
+class BoardStateTest(TestCase):
+    def test_agrees_with_evaluate_ints(self):
+        rnd = Random(21)
+        for _ in range(3000):
+            ids = rnd.sample(range(52), rnd.randint(5, 9))
+            cut = rnd.randint(0, len(ids))
+            self.assertEqual(
+                BoardState(ids[:cut]).rank(*ids[cut:]), evaluate_ints(ids), ids
+            )
+
+    def test_streets(self):
+        flop = BoardState(map(Card.to_int, CardSet.parse("QS JS 2D")))
+        river = flop.add(Card.parse("TS").to_int()).add(Card.parse("3C").to_int())
+        self.assertEqual(len(river.ids), 5)
+        hand = tuple(map(Card.to_int, CardSet.parse("AS KS")))
+        self.assertEqual(category(river.rank(*hand)), 9)
+        self.assertEqual(
+            river.rank(*hand), evaluate(CardSet.parse("QS JS 2D TS 3C AS KS"))
+        )
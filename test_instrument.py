@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+import equty
+import instrument
+from card import CardSet
+from combinations import Combination
+
+
+class InstrumentTest(TestCase):
+    def setUp(self):
+        instrument.reset()
+
+    def tearDown(self):
+        instrument.disable()
+        instrument.reset()
+
+    def test_disabled_leaves_functions_alone(self):
+        find_highest = Combination.find_highest
+        showdowns = equty._showdowns_chunk
+        instrument.enable()
+        self.assertIsNot(equty._showdowns_chunk, showdowns)
+        instrument.disable()
+        self.assertIs(Combination.find_highest, find_highest)
+        self.assertIs(equty._showdowns_chunk, showdowns)
+
+        Combination.find_highest(CardSet.parse("AD 5D AS 2H 4C"))
+        self.assertDictEqual(instrument.snapshot()["find_highest"], {})
+
+    def test_combination_counters(self):
+        instrument.enable()
+        pair = Combination.find_highest(CardSet.parse("AD 5D AS 2H 4C"))
+        Combination.find_highest_by_trial(CardSet.parse("AD 5D AS 2H 4C"))
+        pair.compare(pair)
+
+        snapshot = instrument.snapshot()
+        self.assertDictEqual(snapshot["find_highest"], {"Pair": 1})
+        # по одной неудаче на каждый класс старше пары
+        self.assertEqual(sum(snapshot["try_make_failures"].values()), 7)
+        self.assertEqual(snapshot["compare"]["calls"], 1)
+
+    def test_equity_phases(self):
+        instrument.enable()
+        equty.compute_equity(
+            CardSet.parse("AS KD").cards,
+            CardSet.parse("QS JS 2D").cards,
+            3,
+            n=3000,
+            exact=False,
+        )
+        equity = instrument.snapshot()["equity"]
+        self.assertEqual(equity["calls"], 1)
+        self.assertEqual(equity["trials"], 3000)
+        self.assertGreater(equity["trials_per_second"], 0)
+        self.assertSetEqual(
+            set(equity["phases"]), {"deal", "convert", "evaluate", "compare"}
+        )
+
+    def test_prometheus(self):
+        instrument.enable()
+        Combination.find_highest(CardSet.parse("AD 5D AS 2H 4C"))
+        text = instrument.prometheus()
+        self.assertIn('poker_find_highest_total{combination="Pair"} 1', text)
+        self.assertIn("# TYPE poker_equity_trials_total counter", text)
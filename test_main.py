@@ -0,0 +1,62 @@
+from io import StringIO
+from unittest import TestCase
+import json
+
+from main import compare_hands, run_batch
+
+LINES = [
+    "AS AD AH 2C 3D\tKS KD KH 2S 3C\n",
+    "2C 6H AD 9S JD | 2D 6S AH 9C JH\n",
+    "2C 6H AD 9S JD|AS AD AH 2C 3D\n",
+    "2C 6H ZZ 9S JD|AS AD AH 2C 3D\n",
+    "AS AD AH 2C 3D\n",
+]
+
+
+class CompareHandsTest(TestCase):
+    def test_compare(self):
+        self.assertEqual(compare_hands("AS AD AH 2C 3D", "KS KD KH 2S 3C"), 1)
+        self.assertEqual(compare_hands("2C 6H AD 9S JD", "2D 6S AH 9C JH"), 0)
+
+
+class BatchTest(TestCase):
+    def test_plain(self):
+        out = StringIO()
+        self.assertEqual(run_batch(LINES, out, chunk_size=2, stats=None), (5, 2))
+        self.assertListEqual(out.getvalue().split("\n"), ["1", "0", "-1", "", "", ""])
+
+    def test_json(self):
+        out = StringIO()
+        run_batch(LINES, out, as_json=True, stats=None)
+        records = list(map(json.loads, out.getvalue().splitlines()))
+        self.assertListEqual([r.get("result") for r in records], [1, 0, -1, None, None])
+        self.assertListEqual([r["line"] for r in records], [1, 2, 3, 4, 5])
+        self.assertIn("error", records[3])
+
+    def test_workers_preserve_order(self):
+        lines = LINES[:3] * 50
+        single, multi = StringIO(), StringIO()
+        run_batch(lines, single, stats=None)
+        run_batch(lines, multi, workers=2, chunk_size=7, stats=None)
+        self.assertEqual(single.getvalue(), multi.getvalue())
+
+    def test_duplicate_cards(self):
+        lines = [
+            "AS AS AS AS AS|KS KD KH 2S 3C\n",
+            "AS AS AS AS AS AS AS|KS KD KH 2S 3C\n",
+            LINES[0],
+        ]
+        out = StringIO()
+        self.assertEqual(run_batch(lines, out, stats=None), (3, 2))
+        self.assertListEqual(out.getvalue().split("\n"), ["", "", "1", ""])
+
+        out = StringIO()
+        run_batch(lines, out, as_json=True, stats=None)
+        records = list(map(json.loads, out.getvalue().splitlines()))
+        self.assertListEqual([r.get("result") for r in records], [None, None, 1])
+        self.assertIn("Duplicate cards", records[0]["error"])
+
+    def test_stats(self):
+        stats = StringIO()
+        run_batch(LINES[:2], StringIO(), stats=stats)
+        self.assertIn("2 pairs, 0 errors", stats.getvalue())
@@ -0,0 +1,77 @@
+from collections import Counter
+from itertools import combinations
+from unittest import TestCase
+
+from card import Card, CardSet
+from combinations import Combination, Flush, HighCard, Pair, StraightFlush
+from outs import hand_odds
+
+
+class HandOddsTest(TestCase):
+    def brute_force(self, hand: tuple, table: tuple) -> Counter:
+        known = set(hand) | set(table)
+        rest = [Card.from_int(i) for i in range(52) if Card.from_int(i) not in known]
+        return Counter(
+            type(Combination.find_highest(CardSet([*hand, *table, *runout])))
+            for runout in combinations(rest, 5 - len(table))
+        )
+
+    def test_matches_brute_force(self):
+        for handstr, tablestr in (
+            ("AS KS", "QS JS 2D"),
+            ("AS AD", "KS KD 5C"),
+            ("AS KS", "QS JS 2S"),
+            ("7C 8D", "9H TS 2C"),
+            ("AH 7D", "QS JS 2D 7H"),
+            ("AH 7D", "QS JS 2D 7H 7S"),
+        ):
+            hand, table = CardSet.parse(handstr).cards, CardSet.parse(tablestr).cards
+            odds = hand_odds(hand, table)
+            expected = self.brute_force(hand, table)
+            self.assertEqual(odds.runouts, sum(expected.values()))
+            self.assertLessEqual(odds.evaluated, odds.runouts)
+            self.assertEqual({c: n for c, n in odds.counts.items() if n}, expected)
+            self.assertIs(
+                odds.current, type(Combination.find_highest(CardSet([*hand, *table])))
+            )
+
+    def test_suit_symmetry(self):
+        odds = hand_odds(CardSet.parse("AS KS").cards)
+        self.assertEqual(odds.runouts, 2118760)
+        self.assertEqual(sum(odds.counts.values()), odds.runouts)
+        # одномастные руки: любые перестановки трех других мастей
+        self.assertLess(odds.evaluated * 5, odds.runouts)
+        self.assertEqual(odds, hand_odds(CardSet.parse("KH AH").cards))
+        self.assertAlmostEqual(sum(odds.distribution.values()), 1)
+
+        offsuit = hand_odds(CardSet.parse("AS KD").cards)
+        self.assertLess(offsuit.distribution[Flush], odds.distribution[Flush])
+        self.assertLess(
+            offsuit.distribution[StraightFlush], odds.distribution[StraightFlush]
+        )
+
+    def test_improve(self):
+        odds = hand_odds(CardSet.parse("2C 2H").cards)
+        self.assertIs(odds.current, Pair)
+        self.assertEqual(odds.counts[HighCard], 0)
+        self.assertNotIn(Pair, odds.improve)
+        self.assertAlmostEqual(odds.improvement, 1 - odds.distribution[Pair])
+        self.assertAlmostEqual(odds.at_least(Pair), 1)
+        self.assertAlmostEqual(
+            odds.at_least(StraightFlush), odds.improve[StraightFlush]
+        )
+
+        river = hand_odds(
+            *map(lambda s: CardSet.parse(s).cards, ("AH 7D", "QS JS 2D 7H 7S"))
+        )
+        self.assertEqual((river.runouts, river.improvement), (1, 0))
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            hand_odds(CardSet.parse("AS").cards)
+        with self.assertRaises(ValueError):
+            hand_odds(CardSet.parse("AS KS").cards, CardSet.parse("AS 2D 3D").cards)
+        with self.assertRaises(ValueError):
+            hand_odds(
+                CardSet.parse("AS KS").cards, CardSet.parse("2D 3D 4D 5D 6D 7D").cards
+            )
@@ -0,0 +1,148 @@
+from copy import copy
+from itertools import combinations
+from math import comb
+from typing import cast
+from unittest import TestCase, skipUnless
+from tempfile import TemporaryDirectory
+import os
+
+import numpy as np
+
+from card import Card, CardSet
+import preflop
+from equty import equity_stats
+from preflop import PreflopTable, build, class_name, hand_class, representative
+from rank_table import _colex_combinations, lookup_batch
+
+
+def cls(handstr: str) -> int:
+    return hand_class(*map(Card.to_int, CardSet.parse(handstr)))
+
+
+class HandClassTest(TestCase):
+    def test_names(self):
+        self.assertEqual(class_name(cls("AS AD")), "AA")
+        self.assertEqual(class_name(cls("AS KS")), "AKs")
+        self.assertEqual(class_name(cls("KS AH")), "AKo")
+        self.assertEqual(class_name(cls("7C 2D")), "72o")
+        self.assertEqual(len({class_name(i) for i in range(169)}), 169)
+
+    def test_suit_isomorphism(self):
+        self.assertEqual(cls("AH KH"), cls("AS KS"))
+        self.assertEqual(cls("AH KD"), cls("AC KS"))
+        self.assertNotEqual(cls("AH KH"), cls("AH KD"))
+
+    def test_representative(self):
+        for index in range(169):
+            self.assertEqual(hand_class(*representative(index)), index)
+
+
+class PreflopTableTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = TemporaryDirectory()
+        path = build(
+            os.path.join(cls.dir.name, "preflop.npz"), boards=100, multiway_trials=100
+        )
+        cls.table = PreflopTable(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dir.cleanup()
+
+    def test_combo_counts(self):
+        self.assertEqual(self.table.combos[cls("AS AD")].sum(), 1225)
+        self.assertEqual(self.table.combos[cls("AS AD"), cls("AS AD")], 1)
+        self.assertEqual(self.table.combos[cls("AS KS"), cls("AS KD")], 6)
+
+    def test_matchup(self):
+        win, tie = self.table.matchup(cls("AS AD"), cls("KS KD"))
+        self.assertAlmostEqual(win, 0.82, delta=0.04)
+        win, tie = self.table.matchup(cls("AS AD"), cls("AH AC"))
+        self.assertGreater(tie, 0.9)
+
+    def test_equity(self):
+        hand = tuple(map(Card.to_int, CardSet.parse("AS AD")))
+        self.assertAlmostEqual(self.table.equity(*hand, 2)[2], 0.85, delta=0.03)
+        self.assertLess(self.table.equity(*hand, 6)[0], self.table.equity(*hand, 3)[0])
+
+    def test_sampled(self):
+        self.assertFalse(self.table.exact)
+
+    def test_equity_stats_shortcut(self):
+        saved = dict(preflop._loaded)
+        hand = CardSet.parse("AS AD").cards
+        ids = tuple(map(Card.to_int, hand))
+        exactTable = copy(self.table)
+        exactTable.exact = True
+        try:
+            # таблица по случайным столам без явного согласия не используется
+            preflop._loaded[preflop.DEFAULT_PATH] = self.table
+            self.assertEqual(
+                equity_stats(hand, (), 2, 2000, seed=1),
+                equity_stats(hand, (), 2, 2000, seed=1, use_table=False),
+            )
+            self.assertEqual(
+                equity_stats(hand, (), 2, use_table=True).equity,
+                self.table.equity(*ids, 2)[2],
+            )
+            self.assertEqual(
+                equity_stats(hand, (), 3, use_table=True).equity,
+                self.table.equity(*ids, 3)[2],
+            )
+
+            # точная - используется один на один, но не для нескольких соперников
+            preflop._loaded[preflop.DEFAULT_PATH] = exactTable
+            self.assertEqual(
+                equity_stats(hand, (), 2).equity, exactTable.equity(*ids, 2)[2]
+            )
+            self.assertNotEqual(
+                equity_stats(hand, (), 2, use_table=False).equity,
+                exactTable.equity(*ids, 2)[2],
+            )
+            self.assertEqual(
+                equity_stats(hand, (), 3, 2000, seed=1),
+                equity_stats(hand, (), 3, 2000, seed=1, use_table=False),
+            )
+            with self.assertRaises(ValueError):
+                equity_stats(CardSet.parse("AS AS").cards, (), 2)
+        finally:
+            preflop._loaded.clear()
+            preflop._loaded.update(saved)
+
+
+class ExactTableTest(TestCase):
+    def test_canonical_boards(self):
+        boards, sizes = preflop._canonical_boards()
+        self.assertEqual(len(boards), 134459)
+        self.assertEqual(sizes.sum(), comb(52, 5))
+        self.assertTrue((np.diff(sizes) >= 0).all())
+
+    @skipUnless(
+        getattr(preflop.get_table(), "exact", False), "exact preflop table is not built"
+    )
+    def test_matches_enumeration(self):
+        table = cast(PreflopTable, preflop.get_table())
+        for herostr, villainstr in (("AS AD", "KS KD"), ("JS TS", "9H 8H")):
+            hero, villain = cls(herostr), cls(villainstr)
+            heroCards = representative(hero)
+            wins = ties = total = 0
+            for cards in combinations(range(52), 2):
+                if hand_class(*cards) != villain or set(cards) & set(heroCards):
+                    continue
+                pool = np.delete(np.arange(52), [*heroCards, *cards])
+                boards = pool[_colex_combinations(len(pool), 5)]
+                n = len(boards)
+                heroRanks = lookup_batch(
+                    np.hstack((boards, np.broadcast_to(heroCards, (n, 2))))
+                )
+                villainRanks = lookup_batch(
+                    np.hstack((boards, np.broadcast_to(cards, (n, 2))))
+                )
+                wins += (heroRanks > villainRanks).sum()
+                ties += (heroRanks == villainRanks).sum()
+                total += n
+            win, tie = table.matchup(hero, villain)
+            # доли хранятся с точностью 1 / 65535
+            self.assertAlmostEqual(win, wins / total, delta=1e-5)
+            self.assertAlmostEqual(tie, ties / total, delta=1e-5)
@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+from card import Card, CardSet
+from ranges import Range, range_equity
+
+
+def combos(rangestr: str) -> set[str]:
+    return {
+        " ".join(map(str, map(Card.from_int, c))) for c in Range.parse(rangestr).combos
+    }
+
+
+class RangeParseTest(TestCase):
+    def test_sizes(self):
+        for rangestr, size in (
+            ("AA", 6),
+            ("QQ+", 18),
+            ("99-66", 24),
+            ("AKs", 4),
+            ("AKo", 12),
+            ("AK", 16),
+            ("A5s+", 36),
+            ("KQo-K9o", 48),
+            ("76s-54s", 12),
+            ("QQ+, AKs, 76s-54s", 34),
+            ("ASKH", 1),
+        ):
+            self.assertEqual(len(Range.parse(rangestr)), size, rangestr)
+        self.assertEqual(len(Range.random()), 1326)
+
+    def test_suits(self):
+        self.assertIn("AH KH", combos("AKs"))
+        self.assertNotIn("AH KD", combos("AKs"))
+        self.assertIn("AH KD", combos("AKo"))
+        self.assertSetEqual(combos("76s-54s") & combos("65s"), combos("65s"))
+
+    def test_weights(self):
+        r = Range.parse("AKs:0.5, QQ")
+        self.assertSetEqual(set(r.combos.values()), {0.5, 1.0})
+        self.assertEqual(len(Range.parse("AKs:0")), 0)
+
+    def test_bad(self):
+        for rangestr in ("AX", "AKx", "AAs", "AKs-QJo", "AKs-72s"):
+            self.assertRaises(ValueError, Range.parse, rangestr)
+
+
+class RangeEquityTest(TestCase):
+    def test_aces_vs_kings(self):
+        result = range_equity(Range.parse("AA"), [Range.parse("KK")], n=20000, seed=0)
+        self.assertAlmostEqual(result.equity, 0.82, delta=0.01)
+        self.assertEqual(len(result.combos), 6)
+
+    def test_card_removal(self):
+        # у соперника не может быть туза пик, который есть у героя
+        result = range_equity(
+            Range.from_cards(CardSet.parse("AS AH").cards),
+            [Range.parse("ASKS, KDKC")],
+            n=2000,
+            seed=1,
+        )
+        self.assertAlmostEqual(result.equity, 0.82, delta=0.03)
+
+    def test_board_removes_combos(self):
+        result = range_equity(
+            Range.parse("AA"),
+            [Range.random()],
+            CardSet.parse("AS 7D 2C").cards,
+            n=2000,
+            seed=2,
+        )
+        self.assertEqual(len(result.combos), 3)
+
+    def test_split(self):
+        result = range_equity(
+            Range.parse("22"),
+            [Range.parse("33")],
+            CardSet.parse("AS KS QS JS TS").cards,
+            n=500,
+            seed=3,
+        )
+        self.assertEqual(result.equity, 0.5)
+
+    def test_incompatible(self):
+        self.assertRaises(
+            ValueError,
+            range_equity,
+            Range.parse("ASAH"),
+            [Range.parse("ASAH")],
+            n=10,
+        )
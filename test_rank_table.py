@@ -0,0 +1,93 @@
+from unittest import TestCase
+from random import Random
+from tempfile import TemporaryDirectory
+from itertools import combinations
+import os
+
+import numpy as np
+
+from evaluator import evaluate_ints
+from rank_table import RankTable, build, colex_index, default_path, lookup_batch
+
+
+class ColexTest(TestCase):
+    def test_bijection(self):
+        indices = sorted(colex_index(c) for c in combinations(range(9), 5))
+        self.assertListEqual(indices, list(range(len(indices))))
+
+    def test_order_independent(self):
+        self.assertEqual(colex_index((40, 3, 17)), colex_index((3, 17, 40)))
+
+
+class RankTableTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = TemporaryDirectory()
+        cls.table = RankTable(build(os.path.join(cls.dir.name, "rank5.npy"), k=5))
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.table
+        cls.dir.cleanup()
+
+    def test_size(self):
+        self.assertEqual(self.table.k, 5)
+        self.assertEqual(len(self.table.table), 2598960)
+
+    def test_agrees_with_evaluator(self):
+        rnd = Random(3)
+        for _ in range(2000):
+            ids = rnd.sample(range(52), 5)
+            self.assertEqual(self.table.evaluate_ints(ids), evaluate_ints(ids))
+
+    def test_batch(self):
+        rnd = Random(4)
+        hands = np.array([rnd.sample(range(52), 5) for _ in range(500)])
+        self.assertListEqual(
+            self.table.evaluate_batch(hands).tolist(),
+            [evaluate_ints(h) for h in hands.tolist()],
+        )
+
+    def test_invalid_sets(self):
+        for hands in ([[0, 0, 1, 2, 3]], [[0, 1, 2, 3, 52]], [[-1, 1, 2, 3, 4]]):
+            with self.assertRaises(ValueError):
+                self.table.evaluate_batch(np.array(hands))
+        with self.assertRaises(ValueError):
+            self.table.evaluate_batch(np.array([[0, 1, 2, 3, 4, 5]]))
+
+
+class LargeRankTableTest(TestCase):
+    """Таблицы для 6 и 7 карт: у них номер набора складывается из смещения
+    отрезка старших карт и номера младших пяти"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = TemporaryDirectory()
+        cls.tables = {6: RankTable(build(os.path.join(cls.dir.name, "rank6.npy"), k=6))}
+        # таблица для 7 карт строится долго: берется готовая, если она есть
+        path = default_path(7)
+        if not os.path.exists(path):
+            path = build(os.path.join(cls.dir.name, "rank7.npy"), k=7)
+        cls.tables[7] = RankTable(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.tables
+        cls.dir.cleanup()
+
+    def test_agrees_with_evaluator(self):
+        rnd = Random(5)
+        for k, table in self.tables.items():
+            hands = np.array([rnd.sample(range(52), k) for _ in range(5000)])
+            # крайние наборы: самые младшие и самые старшие карты
+            hands = np.vstack((hands, [range(k), range(52 - k, 52)]))
+            self.assertListEqual(
+                table.evaluate_batch(hands).tolist(),
+                [evaluate_ints(h) for h in hands.tolist()],
+            )
+            for h in hands[:200].tolist():
+                self.assertEqual(table.evaluate_ints(h), evaluate_ints(h))
+
+    def test_lookup_batch_rejects_duplicates(self):
+        with self.assertRaises(ValueError):
+            lookup_batch(np.array([[51] * 7]))
@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+import numpy as np
+
+from card import CardSet
+from equty import compute_equity, enumerate_equity
+from sampling import SAMPLERS, Dealer, get_sampler, stratified_deals
+
+
+class DealerTest(TestCase):
+    pool = list(range(7, 52))
+
+    def test_deal(self):
+        dealer = Dealer(self.pool, np.random.default_rng(0))
+        counts = np.zeros(52, dtype=int)
+        for _ in range(4500):
+            cards = dealer.deal(5)[:5]
+            self.assertEqual(len(set(cards)), 5)
+            self.assertTrue(set(cards) <= set(self.pool))
+            counts[cards] += 1
+        # каждая карта выпадает в среднем 500 раз
+        self.assertTrue((abs(counts[7:] - 500) < 100).all())
+        self.assertEqual(sorted(dealer.deal(0)), self.pool)
+
+    def test_reproducible(self):
+        first = Dealer(self.pool, np.random.default_rng(3))
+        second = Dealer(self.pool, np.random.default_rng(3))
+        for _ in range(2000):
+            self.assertEqual(first.deal(9)[:9], second.deal(9)[:9])
+        self.assertTrue((first.deal_batch(100, 4) == second.deal_batch(100, 4)).all())
+
+    def test_deal_batch(self):
+        dealer = Dealer(self.pool, np.random.default_rng(1))
+        for _ in range(2):
+            dealt = dealer.deal_batch(9000, 3)
+            self.assertEqual(dealt.shape, (9000, 3))
+            self.assertTrue((np.diff(np.sort(dealt), axis=1) != 0).all())
+            counts = np.bincount(dealt.ravel(), minlength=52)[7:]
+            self.assertTrue((abs(counts - 600) < 120).all())
+
+
+class SamplersTest(TestCase):
+    def test_deals_are_valid(self):
+        pool = np.arange(3, 48)
+        for name, sampler in SAMPLERS.items():
+            for n_board, n_cards in ((0, 2), (1, 3), (2, 12), (5, 7)):
+                with self.subTest(sampler=name, n_board=n_board):
+                    dealt = sampler(
+                        pool, n_board, n_cards, 501, np.random.default_rng(1)
+                    )
+                    self.assertEqual(dealt.shape, (501, n_cards))
+                    self.assertTrue(np.isin(dealt, pool).all())
+                    self.assertTrue((np.diff(np.sort(dealt), axis=1) > 0).all())
+
+    def test_stratified_covers_strata_evenly(self):
+        pool = np.arange(46)
+        dealt = stratified_deals(pool, 1, 3, 46 * 10 + 5, np.random.default_rng(0))
+        counts = np.bincount(dealt[:, 0], minlength=46)
+        self.assertEqual(counts.min(), 10)
+        self.assertEqual(counts.max(), 11)
+
+    def test_unbiased(self):
+        hand = CardSet.parse("AH KH").cards
+        table = CardSet.parse("QS JS 2D 5C").cards
+        exact = enumerate_equity(hand, table, 2).equity
+        for name in SAMPLERS:
+            with self.subTest(sampler=name):
+                self.assertAlmostEqual(
+                    compute_equity(
+                        hand, table, 2, n=20000, seed=5, exact=False, sampler=name
+                    ),
+                    exact,
+                    delta=0.015,
+                )
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, get_sampler, "sobol")
+        self.assertRaises(
+            ValueError,
+            compute_equity,
+            CardSet.parse("AH KH").cards,
+            (),
+            2,
+            exact=False,
+            sampler="sobol",
+        )
+
+    def test_loop_requires_random(self):
+        self.assertRaises(
+            ValueError,
+            compute_equity,
+            CardSet.parse("AH KH").cards,
+            CardSet.parse("QS JS 2D").cards,
+            2,
+            batched=False,
+            exact=False,
+            sampler="quasi",
+        )
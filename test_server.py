@@ -0,0 +1,127 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase
+
+from server import Client, EquityServer, ServiceError
+
+
+class ServerTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = EquityServer(workers=1, window=0.01)
+        await self.server.start()
+        self.client = await Client.connect(*self.server.address[:2])
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_compare(self):
+        self.assertEqual(
+            await self.client.call("compare", a="AS AD AH 2C 3D", b="KS KD KH 2S 3C"),
+            1,
+        )
+        self.assertEqual(
+            await self.client.call(
+                "compare", a="2C 6H AD 9S JD", b="2D 6S AH 9C JH 4C 3S"
+            ),
+            -1,
+        )
+
+    async def test_compare_micro_batched(self):
+        results = await asyncio.gather(
+            *(
+                self.client.call("compare", a="AS AD AH 2C 3D", b=b)
+                for b in ("KS KD KH 2S 3C", "AS AD AH 2C 3D", "2S 3S 4S 5S 6S") * 10
+            )
+        )
+        self.assertListEqual(results, [1, 0, -1] * 10)
+        self.assertEqual(self.server.stats()["batches"]["compare"], 1)
+
+    async def test_compare_bad_item_in_batch(self):
+        good = self.client.call("compare", a="AS AD AH 2C 3D", b="KS KD KH 2S 3C")
+        bad = self.client.call("compare", a="AH AH AH AH AH AH AH", b="KS KD KH 2S 3C")
+        results = await asyncio.gather(good, bad, return_exceptions=True)
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ServiceError)
+        self.assertIn("Duplicate cards", str(results[1]))
+
+        # неверный набор, уже попавший в пакет, не мешает остальным сравнениям
+        batches = self.server.stats()["batches"]["compare"]
+        results = await asyncio.gather(
+            self.server._compare.submit(((0, 4, 8, 12, 16), (1, 5, 9, 13, 17))),
+            self.server._compare.submit(((51,) * 7, (1, 5, 9, 13, 17))),
+            return_exceptions=True,
+        )
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(self.server.stats()["batches"]["compare"], batches + 1)
+
+    async def test_equity_coalesced(self):
+        request = dict(hand="AS KD", table="QS JS 2D 3C", players=3, n=2000, seed=1)
+        results = await asyncio.gather(
+            *(self.client.call("equity", **request) for _ in range(5))
+        )
+        self.assertTrue(all(r == results[0] for r in results))
+        self.assertAlmostEqual(
+            results[0]["win"] + results[0]["tie"] + results[0]["loss"], 1
+        )
+        self.assertEqual(self.server.coalesced, 4)
+
+    async def test_equity_tasks(self):
+        submitted = []
+
+        class Executor(ThreadPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                submitted.append(fn.__name__)
+                return super().submit(fn, *args, **kwargs)
+
+        server = EquityServer(executor=Executor(max_workers=4))
+        results = await asyncio.gather(
+            *(
+                server.equity("AS KD", "QS JS 2D", 2, n=1000, seed=seed)
+                for seed in range(4)
+            )
+        )
+        await server.close()
+        self.assertEqual(submitted, ["_equity"] * 4, "One pool task per request")
+        self.assertEqual(len({r["equity"] for r in results}), 4)
+
+    async def test_errors(self):
+        with self.assertRaises(ServiceError):
+            await self.client.call("compare", a="AS ZZ", b="KS KD KH 2S 3C")
+        with self.assertRaises(ServiceError):
+            await self.client.call("equity", hand="AS KD", table="AS 2D 3C")
+        with self.assertRaises(ServiceError):
+            await self.client.call("shuffle")
+        # соединение продолжает работать после ошибок
+        self.assertEqual(
+            await self.client.call("compare", a="2C 3C 4C 5C 6C", b="2C 3C 4C 5C 6C"),
+            0,
+        )
+
+    async def test_latency_stats(self):
+        await self.client.call("compare", a="AS AD AH 2C 3D", b="KS KD KH 2S 3C")
+        stats = await self.client.call("stats")
+        self.assertEqual(stats["latency"]["compare"]["count"], 1)
+        self.assertEqual(sum(stats["latency"]["compare"]["buckets"].values()), 1)
+
+
+class UnixSocketTest(IsolatedAsyncioTestCase):
+    async def test_unix_socket(self):
+        with TemporaryDirectory() as dir:
+            path = os.path.join(dir, "equity.sock")
+            server = EquityServer(workers=1)
+            await server.start(path=path)
+            client = await Client.connect(path=path)
+            try:
+                self.assertEqual(
+                    await client.call(
+                        "compare", a="AS AD AH 2C 3D", b="KS KD KH 2S 3C"
+                    ),
+                    1,
+                )
+            finally:
+                await client.close()
+                await server.close()
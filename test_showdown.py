@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+import numpy as np
+
+from card import CardSet
+from showdown import pot_shares, showdown
+
+
+def hands(*handstrs: str) -> list[tuple]:
+    return [CardSet.parse(h).cards for h in handstrs]
+
+
+class ShowdownTest(TestCase):
+    def test_groups(self):
+        table = CardSet.parse("AS KD 7C 7H 2S").cards
+        self.assertListEqual(
+            showdown(table, hands("AD 3C", "KS KH", "QC JC", "AH 4D")),
+            [[1], [0, 3], [2]],
+        )
+
+    def test_board_plays(self):
+        table = CardSet.parse("AS KS QS JS TS").cards
+        self.assertListEqual(
+            showdown(table, hands("2C 3D", "4H 5H", "7C 8C")), [[0, 1, 2]]
+        )
+
+    def test_duplicates(self):
+        table = CardSet.parse("AS KD 7C 7H 2S").cards
+        self.assertRaises(ValueError, showdown, table, hands("AS 3C", "KS KH"))
+
+
+class PotSharesTest(TestCase):
+    def test_split(self):
+        ranks = np.array([[5, 5, 3], [1, 2, 3], [4, 4, 4]])
+        np.testing.assert_allclose(
+            pot_shares(ranks),
+            [[0.5, 0.5, 0], [0, 0, 1], [1 / 3, 1 / 3, 1 / 3]],
+        )
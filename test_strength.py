@@ -0,0 +1,92 @@
+from itertools import combinations
+from unittest import TestCase
+
+import numpy as np
+
+from card import Card, CardSet
+from equty import enumerate_equity
+from evaluator import evaluate_ints
+from strength import COMBOS, board_strength, bucket, kmeans
+
+
+class BoardStrengthTest(TestCase):
+    def test_matches_equity(self):
+        for boardstr in ("QS JS 2D", "QS JS 2D 7H", "QS JS 2D 7H 7S"):
+            board = CardSet.parse(boardstr).cards
+            strength = board_strength(board)
+            self.assertEqual(
+                strength.valid.sum(), len(list(combinations(range(52 - len(board)), 2)))
+            )
+            for handstr in ("AS KS", "AH KD", "2C 2H", "7C 8D"):
+                hand = CardSet.parse(handstr).cards
+                i = strength.index(hand)
+                self.assertAlmostEqual(
+                    strength.ehs[i], enumerate_equity(hand, board, 2).equity
+                )
+                self.assertAlmostEqual(strength.histogram[i].sum(), 1)
+                self.assertLessEqual(strength.ehs[i] ** 2, strength.ehs2[i] + 1e-12)
+
+    def test_river(self):
+        board = CardSet.parse("AS KD 7C 7H 2S").cards
+        strength = board_strength(board)
+        np.testing.assert_array_equal(strength.hs, strength.ehs)
+        self.assertTrue((strength.ppot[strength.valid] == 0).all())
+        i = strength.index(CardSet.parse("7S 7D").cards)
+        self.assertEqual(strength.hs[i], 1)
+        self.assertTrue(np.isnan(strength.hs[strength.index(board[:2])]))
+
+    def test_potential(self):
+        board = tuple(CardSet.parse("QS JS 2D 7H").cards)
+        ids = tuple(map(Card.to_int, board))
+        strength = board_strength(board)
+        hand = tuple(map(Card.to_int, CardSet.parse("AS 3S").cards))
+        rest = sorted(set(range(52)) - set(ids) - set(hand))
+        # HP[сейчас][на ривере]: 0 - рука впереди, 1 - ничья, 2 - позади
+        hp = np.zeros((3, 3))
+        for opponent in combinations(rest, 2):
+
+            def state(cards: tuple) -> int:
+                ours, theirs = evaluate_ints(cards + hand), evaluate_ints(
+                    cards + opponent
+                )
+                return 0 if ours > theirs else 1 if ours == theirs else 2
+
+            now = state(ids)
+            for river in set(rest) - set(opponent):
+                hp[now, state(ids + (river,))] += 1
+        totals = hp.sum(axis=1)
+        ppot = (hp[2, 0] + hp[2, 1] / 2 + hp[1, 0] / 2) / (totals[2] + totals[1] / 2)
+        npot = (hp[0, 2] + hp[0, 1] / 2 + hp[1, 2] / 2) / (totals[0] + totals[1] / 2)
+        i = strength.index([Card.from_int(c) for c in hand])
+        self.assertAlmostEqual(strength.ppot[i], ppot)
+        self.assertAlmostEqual(strength.npot[i], npot)
+
+    def test_board_validation(self):
+        self.assertRaises(ValueError, board_strength, CardSet.parse("AS KD").cards)
+        self.assertRaises(ValueError, board_strength, CardSet.parse("AS KD AS").cards)
+
+    def test_cached(self):
+        first = board_strength(CardSet.parse("9H 8H 7H").cards)
+        self.assertIs(first, board_strength(CardSet.parse("7H 9H 8H").cards))
+        self.assertFalse(first.ehs.flags.writeable)
+
+
+class BucketTest(TestCase):
+    def test_kmeans(self):
+        rng = np.random.default_rng(0)
+        points = np.vstack((rng.normal(0, 0.1, (50, 2)), rng.normal(5, 0.1, (30, 2))))
+        centers, labels = kmeans(points, 2, seed=1)
+        self.assertEqual(len(set(labels[:50])), 1)
+        self.assertEqual(len(set(labels[50:])), 1)
+        self.assertNotEqual(labels[0], labels[50])
+        self.assertRaises(ValueError, kmeans, points, 0)
+
+    def test_bucket(self):
+        strength = board_strength(CardSet.parse("QS JS 2D 7H").cards)
+        labels = bucket(strength, 8, seed=0)
+        self.assertEqual(labels.shape, (len(COMBOS),))
+        self.assertTrue((labels[~strength.valid] == -1).all())
+        self.assertSetEqual(set(labels[strength.valid]), set(range(8)))
+        # в одной группе - руки с близкой ожидаемой силой
+        spread = [np.ptp(strength.ehs[labels == i]) for i in range(8)]
+        self.assertLess(np.median(spread), 0.3)